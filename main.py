@@ -2,9 +2,28 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
 import math
+import itertools
+import heapq
+import bisect
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
 import os
+import colorsys
+import threading
+import queue
+import struct
+import json
+import hashlib
+import shutil
+import time
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+import numpy as np
 
 class DataHandler:
+    GENERATOR_VERSION = 1
     @staticmethod
     def is_prime(n):
         """Проверка числа на простоту"""
@@ -23,21 +42,245 @@ class DataHandler:
             while temp % i == 0:
                 factors.append(i)
                 temp = temp // i
-        return (len(factors) == 2 and factors[0]*factors[1] == n) or (len(factors) == 1 and factors[0]**2 == n)
+        if temp > 1:
+            factors.append(temp)
+        return len(factors) == 2
+
+    MR_BASES = (
+        (2_047, (2,)),
+        (1_373_653, (2, 3)),
+        (25_326_001, (2, 3, 5)),
+        (3_215_031_751, (2, 3, 5, 7)),
+        (2_152_302_898_747, (2, 3, 5, 7, 11)),
+        (3_474_749_660_383, (2, 3, 5, 7, 11, 13)),
+        (341_550_071_728_321, (2, 3, 5, 7, 11, 13, 17)),
+        (3_825_123_056_546_413_051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+        (318_665_857_834_031_151_167_461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    )
+    SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47)
+    _ker_tables = None
+    # начало потока полупростых, с которого сканирование блоков дешевле слияния строк
+    SCAN_START = 1 << 20
+    # меньшие окна Ker считаются в текущем процессе: запуск пула дороже самого расчета
+    PARALLEL_MIN_CELLS = 1 << 26
+    # пулы не наследуют через fork процесс с потоками Tk и фоновой генерации
+    MP_CONTEXT = multiprocessing.get_context(
+        'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+    @staticmethod
+    def is_prime_mr(n):
+        """Детерминированный тест Миллера–Рабина (весь 64-битный диапазон)"""
+        if n < 2: return False
+        for p in DataHandler.SMALL_PRIMES:
+            if n % p == 0: return n == p
+        d, s = n - 1, 0
+        while d % 2 == 0:
+            d //= 2
+            s += 1
+        bases = next((b for bound, b in DataHandler.MR_BASES if n < bound), None)
+        if bases is None:
+            raise ValueError(f"Детерминированный тест Миллера–Рабина поддерживает n < {DataHandler.MR_BASES[-1][0]}")
+        for a in bases:
+            x = pow(a, d, n)
+            if x == 1 or x == n - 1:
+                continue
+            for _ in range(s - 1):
+                x = x * x % n
+                if x == n - 1:
+                    break
+            else:
+                return False
+        return True
+
+    @staticmethod
+    def pollard_rho(n):
+        """Нетривиальный делитель составного n (ро-метод Полларда в варианте Брента)"""
+        if n % 2 == 0: return 2
+        for c in itertools.count(1):
+            y, r, q, g = 2, 1, 1, 1
+            while g == 1:
+                x = y
+                for _ in range(r):
+                    y = (y * y + c) % n
+                k = 0
+                while k < r and g == 1:
+                    ys = y
+                    for _ in range(min(128, r - k)):
+                        y = (y * y + c) % n
+                        q = q * abs(x - y) % n
+                    g = math.gcd(q, n)
+                    k += 128
+                r *= 2
+            if g == n:
+                g = 1
+                while g == 1:
+                    ys = (ys * ys + c) % n
+                    g = math.gcd(abs(x - ys), n)
+            if g != n:
+                return g
+
+    @staticmethod
+    def factorize(n):
+        """Разложение на простые множители (Миллер–Рабин + ро-метод Полларда)"""
+        factors = []
+        for p in DataHandler.SMALL_PRIMES:
+            while n % p == 0:
+                factors.append(p)
+                n //= p
+        stack = [n] if n > 1 else []
+        while stack:
+            m = stack.pop()
+            if DataHandler.is_prime_mr(m):
+                factors.append(m)
+            else:
+                d = DataHandler.pollard_rho(m)
+                stack.extend((d, m // d))
+        return sorted(factors)
+
+    @staticmethod
+    def is_semiprime_fast(n):
+        """Быстрая проверка на полупростоту для больших n"""
+        if n < 4: return False
+        count = 0
+        for p in DataHandler.SMALL_PRIMES:
+            while n % p == 0:
+                n //= p
+                count += 1
+            if count > 2: return False
+        if n == 1: return count == 2
+        if count == 2: return False
+        if DataHandler.is_prime_mr(n): return count == 1
+        if count == 1: return False
+        d = DataHandler.pollard_rho(n)
+        return DataHandler.is_prime_mr(d) and DataHandler.is_prime_mr(n // d)
+
+    @staticmethod
+    def classify_semiprimes(values):
+        """Пакетная быстрая классификация: булев массив той же формы"""
+        values = np.asarray(values, dtype=object)
+        flags = [DataHandler.is_semiprime_fast(int(v)) for v in values.ravel()]
+        return np.array(flags, dtype=bool).reshape(values.shape)
+
+    @staticmethod
+    def semiprimes_in_range(lo, hi):
+        """Полупростые числа из [lo, hi): решето по простым до sqrt(hi), если их не больше длины окна,
+        иначе решето до cbrt(hi) + Миллер–Рабин для остатков"""
+        lo = max(lo, 4)
+        if hi <= lo:
+            return np.zeros(0, dtype=np.int64)
+        rem = np.arange(lo, hi, dtype=np.int64)
+        count = np.zeros(hi - lo, dtype=np.int8)
+        root = math.isqrt(hi - 1)
+        full = root <= max(hi - lo, 1 << 16)
+        if full:
+            bound = root
+        else:
+            bound = round((hi - 1) ** (1 / 3))
+            while bound ** 3 > hi - 1: bound -= 1
+            while (bound + 1) ** 3 <= hi - 1: bound += 1
+        for p in DataHandler.iter_primes(bound + 1):
+            pk = p
+            while pk < hi:
+                first = -lo % pk
+                rem[first::pk] //= p
+                count[first::pk] += 1
+                pk *= p
+        if full:
+            # после деления на все простые до sqrt(n) остаток - 1 или одно простое
+            return np.flatnonzero(count + (rem > 1) == 2) + lo
+        # все оставшиеся делители больше cbrt(n): остаток - 1, простое или произведение двух простых
+        result = (count == 2) & (rem == 1)
+        for i in np.flatnonzero((count < 2) & (rem > 1)):
+            result[i] = DataHandler.is_prime_mr(int(rem[i])) == (count[i] == 1)
+        return np.flatnonzero(result) + lo
+
+    @staticmethod
+    def scan_semiprimes(start, stop=None, count=None, block_size=1 << 16):
+        """Полупростые числа по возрастанию поблочным сканированием (для диапазонов около 10^15)"""
+        emitted = 0
+        lo = start
+        while stop is None or lo < stop:
+            hi = lo + block_size if stop is None else min(lo + block_size, stop)
+            for value in DataHandler.semiprimes_in_range(lo, hi).tolist():
+                if count is not None and emitted >= count:
+                    return
+                yield value
+                emitted += 1
+            lo = hi
+
+    @staticmethod
+    def iter_primes(limit, start=2, segment_size=1 << 18):
+        """Сегментированное решето Эратосфена: простые числа из [start, limit)"""
+        start = max(start, 2)
+        if limit <= start:
+            return
+        root = math.isqrt(limit - 1)
+        base = bytearray([1]) * (root + 1)
+        base[:2] = b'\x00\x00'
+        for i in range(2, math.isqrt(root) + 1):
+            if base[i]:
+                base[i*i::i] = bytes(len(range(i*i, root + 1, i)))
+        base_primes = list(itertools.compress(range(root + 1), base))
+        for lo in range(start, limit, segment_size):
+            hi = min(lo + segment_size, limit)
+            segment = bytearray([1]) * (hi - lo)
+            for p in base_primes:
+                if p * p >= hi:
+                    break
+                first = max(p * p, (lo + p - 1) // p * p)
+                segment[first - lo::p] = bytes(len(range(first, hi, p)))
+            yield from itertools.compress(range(lo, hi), segment)
+
+    @staticmethod
+    def iter_semiprimes(count=None, start=4, stop=None, offset=0):
+        """Поток полупростых чисел из [start, stop) по возрастанию: пропуск offset, затем не более count.
+        Слиянию строк нужны все простые меньше start/2, поэтому с больших start идет поблочное сканирование"""
+        end = None if count is None else offset + count
+        if start >= DataHandler.SCAN_START:
+            source = DataHandler.scan_semiprimes(start, stop)
+        else:
+            source = DataHandler._merge_semiprimes(start, stop)
+        return itertools.islice(source, offset, end)
+
+    @staticmethod
+    def _merge_semiprimes(start, stop):
+        """Слияние строк p_i*p_j (j >= i) через кучу; строки подключаются по мере роста минимума"""
+        primes = array('q')
+
+        def prime_at(i):
+            while len(primes) <= i:
+                lo = primes[-1] + 1 if primes else 2
+                primes.extend(DataHandler.iter_primes(max(2 * lo, lo + (1 << 16)), lo))
+            return primes[i]
+
+        def first_index(value):
+            while not primes or primes[-1] < value:
+                prime_at(len(primes))
+            return bisect.bisect_left(primes, value)
+
+        start = max(start, 4)
+        heap = []
+        row = 0
+        while True:
+            while not heap or prime_at(row) ** 2 <= heap[0][0]:
+                p = prime_at(row)
+                if stop is not None and p * p >= stop:
+                    break
+                j = max(row, first_index(-(-start // p)))
+                heapq.heappush(heap, (p * prime_at(j), row, j))
+                row += 1
+            if not heap:
+                return
+            value, i, j = heap[0]
+            if stop is not None and value >= stop:
+                return
+            yield value
+            heapq.heapreplace(heap, (prime_at(i) * prime_at(j + 1), i, j + 1))
 
     @staticmethod
     def generate_semiprimes(count=1000):
-        """Генерация полупростых чисел"""
-        primes = [i for i in range(2, 10000) if DataHandler.is_prime(i)]
-        semiprimes = []
-        for i in range(len(primes)):
-            for j in range(i, len(primes)):
-                product = primes[i] * primes[j]
-                if product not in semiprimes:
-                    semiprimes.append(product)
-                if len(semiprimes) >= count:
-                    return sorted(semiprimes)
-        return sorted(semiprimes)
+        """Генерация count наименьших полупростых чисел"""
+        return list(DataHandler.iter_semiprimes(count=count))
 
     @staticmethod
     def ker(a):
@@ -47,55 +290,1470 @@ class DataHandler:
             a = sum(int(d) for d in str(a))
         return a
 
+    @staticmethod
+    def ker_array(values, out=None):
+        """Векторное ядро: цифровой корень |a| = 1 + (|a| - 1) % 9, Ker(0) = 0"""
+        a = np.abs(np.asarray(values, dtype=np.int64))
+        zero = a == 0
+        np.subtract(a, 1, out=a)
+        np.remainder(a, 9, out=a)
+        np.add(a, 1, out=a)
+        a[zero] = 0
+        if out is None:
+            return a.astype(np.int8)
+        np.copyto(out, a, casting='unsafe')
+        return out
+
+    @staticmethod
+    def ker_grid(x_range=(-50, 50), y_range=(-50, 50), out=None, chunk_cells=1 << 20):
+        """Матрица Ker(x*y - (x+y)) для x из [x0, x1), y из [y0, y1) в int8, по блокам строк"""
+        (x0, x1), (y0, y1) = x_range, y_range
+        if max(abs(x0), abs(x1), abs(y0), abs(y1)) > 3_000_000_000:
+            raise ValueError("Координаты вне диапазона int64, используйте периодический генератор")
+        rows, cols = max(x1 - x0, 0), max(y1 - y0, 0)
+        if out is None:
+            out = np.empty((rows, cols), dtype=np.int8)
+        # x*y - (x+y) = (x-1)*(y-1) - 1
+        y = np.arange(y0 - 1, y1 - 1, dtype=np.int64)
+        step = max(1, chunk_cells // max(cols, 1))
+        for start in range(0, rows, step):
+            x = np.arange(x0 + start - 1, min(x0 + start + step, x1) - 1, dtype=np.int64)[:, None]
+            DataHandler.ker_array(x * y - 1, out=out[start:start + len(x)])
+        return out
+
+    @staticmethod
+    def ker_tables():
+        """Периодические таблицы 9x9 для Ker((x-1)*(y-1) - 1) по (x-1) mod 9, (y-1) mod 9 и знаку аргумента"""
+        if DataHandler._ker_tables is None:
+            i = np.arange(9)
+            r = (i[:, None] * i[None, :] - 1) % 9
+            positive = np.where(r == 0, 9, r).astype(np.int8)
+            negative = np.where(-r % 9 == 0, 9, -r % 9).astype(np.int8)
+            # обе таблицы симметричны, как и сама функция Ker(x*y - (x+y))
+            DataHandler._ker_tables = positive, negative
+        return DataHandler._ker_tables
+
+    @staticmethod
+    def _sign_segments(u0, n):
+        """Отрезки индексов i из [0, n) с постоянным знаком u0 + i"""
+        z = -u0
+        segments = []
+        if z > 0:
+            segments.append((0, min(z, n), -1))
+        if 0 <= z < n:
+            segments.append((z, z + 1, 0))
+        if z + 1 < n:
+            segments.append((max(z + 1, 0), n, 1))
+        return segments
+
+    @staticmethod
+    def ker_grid_periodic(x_range=(-50, 50), y_range=(-50, 50), out=None, chunk_cells=1 << 22):
+        """Матрица Ker(x*y - (x+y)) замощением периодических таблиц с поправкой на знак аргумента"""
+        (x0, x1), (y0, y1) = x_range, y_range
+        rows, cols = max(x1 - x0, 0), max(y1 - y0, 0)
+        if out is None:
+            out = np.empty((rows, cols), dtype=np.int8)
+        if rows == 0 or cols == 0:
+            return out
+        tables = DataHandler.ker_tables()
+        nine = np.arange(9)
+        col_index = ((y0 - 1) % 9 + nine) % 9
+        col_segments = DataHandler._sign_segments(y0 - 1, cols)
+        step = max(9, chunk_cells // cols // 9 * 9)
+        for start in range(0, rows, step):
+            count = min(step, rows - start)
+            row_index = ((x0 - 1 + start) % 9 + nine) % 9
+            reps = (-(-count // 9), -(-cols // 9))
+            tiles = {}
+            for rs, re, su in DataHandler._sign_segments(x0 - 1 + start, count):
+                for cs, ce, sv in col_segments:
+                    # аргумент (x-1)*(y-1) - 1 положителен только при одинаковых знаках x-1 и y-1
+                    kind = 0 if su * sv > 0 else 1
+                    if kind not in tiles:
+                        tiles[kind] = np.tile(tables[kind][np.ix_(row_index, col_index)], reps)
+                    out[start + rs:start + re, cs:ce] = tiles[kind][rs:re, cs:ce]
+        # (x-1)*(y-1) = 1: аргумент равен нулю
+        for x, y in ((2, 2), (0, 0)):
+            if x0 <= x < x1 and y0 <= y < y1:
+                out[x - x0, y - y0] = 0
+        return out
+
+    @staticmethod
+    def _ker_tile(tile):
+        """Задача пула: один тайл матрицы Ker"""
+        x0, x1, y0, y1 = tile
+        return DataHandler.ker_grid_periodic((x0, x1), (y0, y1))
+
+    @staticmethod
+    def _semiprime_tile(bounds):
+        """Задача пула: полупростые числа одного диапазона"""
+        return DataHandler.semiprimes_in_range(*bounds)
+
+    @staticmethod
+    def ker_grid_parallel(x_range=(-50, 50), y_range=(-50, 50), workers=None, tile=2048, out=None):
+        """Матрица Ker, посчитанная тайлами tile x tile в пуле процессов"""
+        (x0, x1), (y0, y1) = x_range, y_range
+        if out is None:
+            out = np.empty((max(x1 - x0, 0), max(y1 - y0, 0)), dtype=np.int8)
+        tiles = [(tx, min(tx + tile, x1), ty, min(ty + tile, y1))
+                 for tx in range(x0, x1, tile) for ty in range(y0, y1, tile)]
+        for (tx0, tx1, ty0, ty1), block in zip(tiles, DataHandler.iter_ker_tiles(tiles, workers)):
+            out[tx0 - x0:tx1 - x0, ty0 - y0:ty1 - y0] = block
+        return out
+
+    @staticmethod
+    def iter_ker_tiles(tiles, workers=None):
+        """Блоки Ker для тайлов (x0, x1, y0, y1) в исходном порядке; пул процессов - только для
+        нескольких тайлов общим размером от PARALLEL_MIN_CELLS и workers != 1"""
+        cells = sum((x1 - x0) * (y1 - y0) for x0, x1, y0, y1 in tiles)
+        if workers == 1 or len(tiles) < 2 or cells < DataHandler.PARALLEL_MIN_CELLS:
+            yield from map(DataHandler._ker_tile, tiles)
+            return
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=DataHandler.MP_CONTEXT)
+        try:
+            yield from pool.map(DataHandler._ker_tile, tiles)
+        finally:
+            # при досрочном закрытии потока (отмена, ошибка записи) несделанные тайлы не считаются
+            pool.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def iter_semiprime_tiles(lo, hi, workers=None, tile=1 << 20):
+        """Полупростые числа из [lo, hi) массивами по тайлам, в порядке возрастания"""
+        bounds = [(start, min(start + tile, hi)) for start in range(lo, hi, tile)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=DataHandler.MP_CONTEXT) as pool:
+            yield from pool.map(DataHandler._semiprime_tile, bounds)
+
+    @staticmethod
+    def semiprimes_parallel(lo, hi, workers=None, tile=1 << 20):
+        """Полупростые числа из [lo, hi), посчитанные в пуле процессов"""
+        parts = list(DataHandler.iter_semiprime_tiles(lo, hi, workers, tile))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+class SemiprimeIndex:
+    """Таблица наименьших простых делителей для пакетной проверки полупростоты"""
+    MAX_LIMIT = 20_000_000
+    # значения выше таблицы: плотные серии (соседи ближе RUN_GAP) проверяются решетом окна, одиночные - по одному
+    RUN_GAP = 1 << 10
+    RUN_BLOCK = 1 << 20
+    _shared = None
+
+    def __init__(self, limit):
+        self.limit = max(limit, 2)
+        spf = np.zeros(self.limit, dtype=np.int32)
+        for p in DataHandler.iter_primes(math.isqrt(self.limit - 1) + 1):
+            block = spf[p*p::p]
+            block[block == 0] = p
+        rest = np.flatnonzero(spf == 0)
+        spf[rest] = rest
+        self.spf = spf
+
+    @classmethod
+    def covering(cls, limit):
+        """Общий индекс, покрывающий значения меньше limit (не больше MAX_LIMIT)"""
+        limit = min(limit, cls.MAX_LIMIT)
+        if cls._shared is None or cls._shared.limit < limit:
+            cls._shared = cls(limit)
+        return cls._shared
+
+    def is_semiprime_batch(self, values):
+        """Классификация массива значений за один проход: n = p*q <=> spf[n/spf[n]] == n/spf[n] > 1"""
+        values = np.asarray(values, dtype=np.int64)
+        result = np.zeros(values.shape, dtype=bool)
+        inside = (values >= 4) & (values < self.limit)
+        v = values[inside]
+        cofactor = v // self.spf[v]
+        result[inside] = (cofactor > 1) & (self.spf[cofactor] == cofactor)
+        outside = values >= self.limit
+        if outside.any():
+            result[outside] = self.classify_runs(values[outside])
+        return result
+
+    @staticmethod
+    def classify_runs(values):
+        """Проверка значений вне таблицы: сортировка, разбиение на серии, решето окна на серию"""
+        unique, inverse = np.unique(values, return_inverse=True)
+        flags = np.zeros(unique.shape, dtype=bool)
+        bounds = np.flatnonzero(np.diff(unique) > SemiprimeIndex.RUN_GAP) + 1
+        for first, last in zip([0, *bounds.tolist()], [*bounds.tolist(), unique.size]):
+            lo, hi = int(unique[first]), int(unique[last - 1]) + 1
+            if (last - first) * SemiprimeIndex.RUN_GAP < hi - lo:
+                for i in range(first, last):
+                    flags[i] = DataHandler.is_semiprime_fast(int(unique[i]))
+                continue
+            for start in range(lo, hi, SemiprimeIndex.RUN_BLOCK):
+                stop = min(start + SemiprimeIndex.RUN_BLOCK, hi)
+                window = np.zeros(stop - start, dtype=bool)
+                window[DataHandler.semiprimes_in_range(start, stop) - start] = True
+                i, j = np.searchsorted(unique, (start, stop))
+                flags[i:j] = window[unique[i:j] - start]
+        return flags[inverse.ravel()]
+
+class GridFile:
+    """Матрица Ker на диске: заголовок с началом окна и размерами + сырые int8 через memmap"""
+    MAGIC = b'KERGRID1'
+    HEADER = struct.Struct('<8sqqqq')
+    OFFSET = 64
+
+    def __init__(self, path, mode='r'):
+        with open(path, 'rb') as f:
+            magic, self.x0, self.y0, rows, cols = self.HEADER.unpack(f.read(self.HEADER.size))
+        if magic != self.MAGIC:
+            raise ValueError(f"Неизвестный формат файла сетки: {path}")
+        self.path = path
+        self.shape = (rows, cols)
+        self.data = np.memmap(path, dtype=np.int8, mode=mode, offset=self.OFFSET, shape=self.shape)
+
+    @classmethod
+    def create(cls, path, x_range, y_range):
+        """Создание пустого файла под окно [x0, x1) x [y0, y1)"""
+        (x0, x1), (y0, y1) = x_range, y_range
+        rows, cols = x1 - x0, y1 - y0
+        if rows <= 0 or cols <= 0:
+            raise ValueError("Пустое окно сетки")
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, x0, y0, rows, cols).ljust(cls.OFFSET, b'\0'))
+            f.truncate(cls.OFFSET + rows * cols)
+        return cls(path, mode='r+')
+
+    @classmethod
+    def generate(cls, path, x_range, y_range, workers=None):
+        """Генерация матрицы Ker прямо в файл, без промежуточной копии в памяти"""
+        grid = cls.create(path, x_range, y_range)
+        if workers == 1:
+            DataHandler.ker_grid_periodic(x_range, y_range, out=grid.data)
+        else:
+            DataHandler.ker_grid_parallel(x_range, y_range, workers=workers, out=grid.data)
+        grid.flush()
+        return grid
+
+    @property
+    def x_range(self):
+        return self.x0, self.x0 + self.shape[0]
+
+    @property
+    def y_range(self):
+        return self.y0, self.y0 + self.shape[1]
+
+    def flush(self):
+        self.data.flush()
+
+IngestStats = namedtuple('IngestStats', 'rows seconds rows_per_sec')
+
+class ConnectionPool:
+    """Соединения SQLite по одному на поток: WAL, короткие транзакции чтения, запись под общей блокировкой"""
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.write_lock = threading.RLock()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connection(self):
+        """Соединение текущего потока (создаётся при первом обращении)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+            self.local.cursor = conn.cursor()
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def cursor(self):
+        """Курсор соединения текущего потока"""
+        self.connection()
+        return self.local.cursor
+
+    @contextmanager
+    def read(self):
+        """Короткая транзакция чтения: несколько запросов видят один снимок БД"""
+        conn = self.connection()
+        if conn.in_transaction:
+            yield self.local.cursor
+            return
+        conn.execute('BEGIN')
+        try:
+            yield self.local.cursor
+        finally:
+            conn.rollback()
+
+    def release(self):
+        """Закрытие соединения текущего потока"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+            with self.lock:
+                self.connections.remove(conn)
+
+    def close_all(self):
+        """Закрытие всех соединений пула (при завершении программы)"""
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
+
 class Database:
-    def __init__(self):
-        os.makedirs('data', exist_ok=True)
-        self.conn = sqlite3.connect('data/database.db')
-        self.cursor = self.conn.cursor()
+    def __init__(self, path='data/database.db'):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.pool = ConnectionPool(path)
         self.create_tables()
 
+    def close(self):
+        """Перенос журнала WAL в основной файл и закрытие всех соединений"""
+        with self.pool.write_lock:
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.pool.close_all()
+
+    @property
+    def conn(self):
+        """Соединение текущего потока"""
+        return self.pool.connection()
+
+    @property
+    def cursor(self):
+        """Курсор текущего потока"""
+        return self.pool.cursor()
+
     def create_tables(self):
         """Создание таблиц БД"""
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS semiprimes (value INTEGER)''')
+        with self.pool.write_lock:
+            self._create_tables()
+
+    def _create_tables(self):
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS semiprimes (
+            value INTEGER, dataset TEXT DEFAULT 'default', ordinal INTEGER)''')
+        columns = [row[1] for row in self.cursor.execute('PRAGMA table_info(semiprimes)')]
+        if 'dataset' not in columns:
+            self.cursor.execute("ALTER TABLE semiprimes ADD COLUMN dataset TEXT DEFAULT 'default'")
+        if 'ordinal' not in columns:
+            self.cursor.execute("ALTER TABLE semiprimes ADD COLUMN ordinal INTEGER")
+            self.cursor.execute('''UPDATE semiprimes SET ordinal = rowid -
+                (SELECT MIN(rowid) FROM semiprimes AS s WHERE s.dataset = semiprimes.dataset)''')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS semiprimes_by_value ON semiprimes (dataset, value)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS semiprimes_by_ordinal ON semiprimes (dataset, ordinal)')
         self.cursor.execute('''CREATE TABLE IF NOT EXISTS ker_values (x INTEGER, y INTEGER, value INTEGER)''')
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS ker_tile_sets (
+            dataset TEXT PRIMARY KEY, x0 INTEGER, y0 INTEGER, rows INTEGER, cols INTEGER, tile_size INTEGER)''')
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS ker_tiles (
+            dataset TEXT, tile_x INTEGER, tile_y INTEGER, x0 INTEGER, y0 INTEGER, rows INTEGER, cols INTEGER, data BLOB,
+            PRIMARY KEY (dataset, tile_x, tile_y))''')
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS datasets (
+            name TEXT PRIMARY KEY, kind TEXT, params TEXT, generator_version INTEGER,
+            content_hash TEXT, rows INTEGER, path TEXT, created_at TEXT)''')
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS sweep_results (
+            data_hash TEXT, model TEXT, params TEXT, min_value INTEGER, histogram TEXT, levels INTEGER,
+            PRIMARY KEY (data_hash, model, params))''')
         self.conn.commit()
 
-    def save_semiprimes(self, data):
-        """Сохранение полупростых чисел"""
-        self.cursor.execute('DELETE FROM semiprimes')
-        self.cursor.executemany('INSERT INTO semiprimes VALUES (?)', [(x,) for x in data])
-        self.conn.commit()
+    def save_semiprimes(self, data, dataset='default', chunk_size=50000):
+        """Сохранение полупростых чисел набора dataset (принимает любой итератор)"""
+        return self.bulk_insert('DELETE FROM semiprimes WHERE dataset = ?',
+                                'INSERT INTO semiprimes (value, dataset, ordinal) VALUES (?, ?, ?)',
+                                ((int(x), dataset, i) for i, x in enumerate(data)), chunk_size, (dataset,))
 
-    def save_ker_values(self, data):
+    def save_ker_values(self, data, chunk_size=50000):
         """Сохранение значений Ker"""
-        self.cursor.execute('DELETE FROM ker_values')
-        self.cursor.executemany('INSERT INTO ker_values VALUES (?, ?, ?)', 
-                               [(x, y, v) for x, row in enumerate(data) for y, v in enumerate(row)])
-        self.conn.commit()
+        return self.bulk_insert('DELETE FROM ker_values', 'INSERT INTO ker_values VALUES (?, ?, ?)',
+                                ((x, y, int(v)) for x, row in enumerate(data) for y, v in enumerate(row)),
+                                chunk_size)
+
+    def save_sweep(self, data_hash, rows):
+        """Сохранение сводки перебора параметров в общую таблицу результатов"""
+        return self.bulk_insert(None, 'INSERT OR REPLACE INTO sweep_results VALUES (?, ?, ?, ?, ?, ?)',
+                                ((data_hash, model, json.dumps(list(params)), low, json.dumps(histogram), levels)
+                                 for model, params, low, histogram, levels in rows))
+
+    def load_ker_values(self):
+        """Матрица 100x100 из устаревшей таблицы ker_values (по ячейке на строку)"""
+        data = [[0]*100 for _ in range(100)]
+        for x, y, v in self.conn.execute("SELECT x, y, value FROM ker_values"):
+            data[x][y] = v
+        return data
+
+    def bulk_insert(self, delete_sql, insert_sql, rows, chunk_size=50000, delete_params=(), setup=()):
+        """Массовая загрузка: одна явная транзакция, пачки по chunk_size строк, статистика строк/с.
+        setup - дополнительные пары (sql, параметры), выполняемые в той же транзакции до вставки"""
+        started = time.perf_counter()
+        total = 0
+        rows = iter(rows)
+        with self.pool.write_lock:
+            synchronous = self.cursor.execute('PRAGMA synchronous').fetchone()[0]
+            cache_size = self.cursor.execute('PRAGMA cache_size').fetchone()[0]
+            self.cursor.execute('PRAGMA synchronous=OFF')
+            self.cursor.execute('PRAGMA cache_size=-65536')
+            try:
+                self.cursor.execute('BEGIN')
+                if delete_sql is not None:
+                    self.cursor.execute(delete_sql, delete_params)
+                for sql, params in setup:
+                    self.cursor.execute(sql, params)
+                for chunk in iter(lambda: list(itertools.islice(rows, chunk_size)), []):
+                    self.cursor.executemany(insert_sql, chunk)
+                    total += len(chunk)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                self.cursor.execute(f'PRAGMA synchronous={int(synchronous)}')
+                self.cursor.execute(f'PRAGMA cache_size={int(cache_size)}')
+        elapsed = time.perf_counter() - started
+        return IngestStats(total, elapsed, total / elapsed if elapsed else float('inf'))
+
+    def ker_tile_set(self, dataset):
+        """Геометрия набора тайлов: словарь x0, y0, rows, cols, tile_size или None"""
+        self.cursor.execute('SELECT x0, y0, rows, cols, tile_size FROM ker_tile_sets WHERE dataset = ?', (dataset,))
+        row = self.cursor.fetchone()
+        return dict(zip(('x0', 'y0', 'rows', 'cols', 'tile_size'), row)) if row else None
+
+    def load_ker_tiles(self, dataset, out=None):
+        """Загрузка матрицы Ker из тайлов прямо в буфер массива (None, если набора нет)"""
+        info = self.ker_tile_set(dataset)
+        if info is None:
+            return None
+        return self.ker_window(dataset, (info['x0'], info['x0'] + info['rows']),
+                               (info['y0'], info['y0'] + info['cols']), out)
+
+    def ker_extent(self, dataset):
+        """Окно набора Ker: ((x0, x1), (y0, y1)) или None (в том числе если файл сетки пропал)"""
+        entry = self.catalog_entry(dataset)
+        if entry is not None and entry['path']:
+            if not os.path.exists(entry['path']):
+                return None
+            grid = GridFile(entry['path'])
+            return grid.x_range, grid.y_range
+        info = self.ker_tile_set(dataset)
+        if info is None:
+            return None
+        return (info['x0'], info['x0'] + info['rows']), (info['y0'], info['y0'] + info['cols'])
+
+    def ker_window(self, dataset, x_range, y_range, out=None):
+        """Значения Ker в прямоугольнике [x0, x1) x [y0, y1) (-1 вне набора): читаются только пересекающие его тайлы"""
+        with self.pool.read():
+            return self._ker_window(dataset, x_range, y_range, out)
+
+    def _ker_window(self, dataset, x_range, y_range, out):
+        (x0, x1), (y0, y1) = x_range, y_range
+        # вне набора -1: ноль - настоящее значение Ker
+        if out is None:
+            out = np.full((x1 - x0, y1 - y0), -1, dtype=np.int8)
+        else:
+            out[...] = -1
+        entry = self.catalog_entry(dataset)
+        if entry is not None and entry['path']:
+            grid = GridFile(entry['path'])
+            (gx0, gx1), (gy0, gy1) = grid.x_range, grid.y_range
+            ax0, ax1, ay0, ay1 = max(x0, gx0), min(x1, gx1), max(y0, gy0), min(y1, gy1)
+            if ax0 < ax1 and ay0 < ay1:
+                out[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = grid.data[ax0 - gx0:ax1 - gx0, ay0 - gy0:ay1 - gy0]
+            return out
+        info = self.ker_tile_set(dataset)
+        if info is None:
+            return out
+        size = info['tile_size']
+        self.cursor.execute('''SELECT x0, y0, rows, cols, data FROM ker_tiles
+            WHERE dataset = ? AND tile_x BETWEEN ? AND ? AND tile_y BETWEEN ? AND ?''',
+                            (dataset, x0 // size, (x1 - 1) // size, y0 // size, (y1 - 1) // size))
+        for tx0, ty0, rows, cols, blob in self.cursor.fetchall():
+            tile = np.frombuffer(blob, dtype=np.int8).reshape(rows, cols)
+            ax0, ax1 = max(x0, tx0), min(x1, tx0 + rows)
+            ay0, ay1 = max(y0, ty0), min(y1, ty0 + cols)
+            if ax0 < ax1 and ay0 < ay1:
+                out[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = tile[ax0 - tx0:ax1 - tx0, ay0 - ty0:ay1 - ty0]
+        return out
+
+    def ker_source(self, dataset):
+        """Источник значений набора Ker: (размер, начало окна, read(x0, x1, y0, y1) в координатах от начала)"""
+        entry = self.catalog_entry(dataset)
+        if entry['path']:
+            grid = GridFile(entry['path'])
+            return grid.shape, (grid.x0, grid.y0), lambda ax0, ax1, ay0, ay1: grid.data[ax0:ax1, ay0:ay1]
+        (x0, x1), (y0, y1) = self.ker_extent(dataset)
+        def read(ax0, ax1, ay0, ay1):
+            return self.ker_window(dataset, (x0 + ax0, x0 + ax1), (y0 + ay0, y0 + ay1))
+        return (x1 - x0, y1 - y0), (x0, y0), read
+
+    def pyramid_path(self, dataset):
+        """Каталог файлов уровней пирамиды детализации набора: рядом с БД, ключ - имя и хэш содержимого"""
+        entry = self.catalog_entry(dataset)
+        key = hashlib.sha256(f"{dataset}\0{entry['content_hash']}".encode()).hexdigest()[:32]
+        return os.path.join(os.path.dirname(self.pool.path) or '.', 'pyramids', key)
+
+    def ker_pyramid(self, dataset, build=True):
+        """Пирамида детализации набора Ker и начало окна. Уровни >= 1 читаются через memmap из файлов
+        рядом с БД; если их еще нет, строятся один раз (при build=False возвращается None)"""
+        shape, origin, read = self.ker_source(dataset)
+        path = self.pyramid_path(dataset)
+        if not os.path.isdir(path):
+            if not build:
+                return None
+            self._build_pyramid(path, shape, read)
+        levels = [GridFile(os.path.join(path, f'L{level}.bin')).data
+                  for level in range(1, TilePyramid.level_count(shape))]
+        return TilePyramid(shape, read, levels), origin
+
+    def _build_pyramid(self, path, shape, read):
+        """Уровни строятся во временном каталоге и переименовываются целиком: недостроенная пирамида не видна"""
+        tmp = f'{path}.tmp{threading.get_ident()}'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        def alloc(level, level_shape):
+            return GridFile.create(os.path.join(tmp, f'L{level}.bin'), (0, level_shape[0]), (0, level_shape[1])).data
+        try:
+            for level in TilePyramid.build_levels(shape, read, alloc):
+                level.flush()
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+        finally:
+            # при ошибке или если другой поток успел построить ту же пирамиду
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _drop_pyramid(self, dataset):
+        """Удаление пирамиды набора перед изменением или удалением его данных"""
+        if self.catalog_entry(dataset) is not None:
+            shutil.rmtree(self.pyramid_path(dataset), ignore_errors=True)
+
+    def semiprimes_in_range(self, dataset, lo, hi):
+        """Полупростые числа набора из [lo, hi) по индексу (dataset, value)"""
+        self.cursor.execute('SELECT value FROM semiprimes WHERE dataset = ? AND value >= ? AND value < ? ORDER BY value',
+                            (dataset, lo, hi))
+        return np.fromiter((row[0] for row in self.cursor), dtype=np.int64)
+
+    def semiprimes_slice(self, dataset, start, stop):
+        """Полупростые числа набора с порядковыми номерами из [start, stop) по индексу (dataset, ordinal)"""
+        self.cursor.execute('''SELECT value FROM semiprimes WHERE dataset = ? AND ordinal >= ? AND ordinal < ?
+            ORDER BY ordinal''', (dataset, start, stop))
+        return np.fromiter((row[0] for row in self.cursor), dtype=np.int64)
+
+    def register_dataset(self, name, kind, params, content_hash, rows, path=None):
+        """Запись набора данных в каталог"""
+        with self.pool.write_lock:
+            self.cursor.execute('INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (name, kind, json.dumps(params, sort_keys=True), DataHandler.GENERATOR_VERSION,
+                                 content_hash, rows, path, time.strftime('%Y-%m-%d %H:%M:%S')))
+            self.conn.commit()
+
+    def catalog_entry(self, name):
+        """Запись каталога по имени набора (None, если набора нет)"""
+        self.cursor.execute('SELECT * FROM datasets WHERE name = ?', (name,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        entry = dict(zip((d[0] for d in self.cursor.description), row))
+        entry['params'] = json.loads(entry['params'])
+        return entry
+
+    def datasets(self, kind=None):
+        """Имена наборов каталога (всех или одного вида)"""
+        if kind is None:
+            self.cursor.execute('SELECT name FROM datasets ORDER BY name')
+        else:
+            self.cursor.execute('SELECT name FROM datasets WHERE kind = ? ORDER BY name', (kind,))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def load_dataset(self, name):
+        """Ленивая загрузка набора по имени: массив значений или матрица Ker"""
+        with self.pool.read():
+            return self._load_dataset(name)
+
+    def _load_dataset(self, name):
+        entry = self.catalog_entry(name)
+        if entry is None:
+            return None
+        if entry['kind'] == 'semiprimes':
+            return self.semiprimes_slice(name, 0, entry['rows'])
+        if entry['path']:
+            return GridFile(entry['path']).data
+        return self.load_ker_tiles(name)
+
+    def _is_current(self, name):
+        """Набор уже есть в каталоге и построен текущей версией генератора"""
+        entry = self.catalog_entry(name)
+        return (entry is not None and entry['generator_version'] == DataHandler.GENERATOR_VERSION
+                and (entry['path'] is None or os.path.exists(entry['path'])))
+
+    @staticmethod
+    def _hash_part(*parts):
+        """Слагаемое аддитивного хэша содержимого: хэш набора - сумма sha256 частей по модулю 2^256"""
+        return int.from_bytes(hashlib.sha256(b''.join(parts)).digest(), 'little')
+
+    def ensure_semiprimes(self, count, name='semiprimes', progress=None):
+        """Первые count полупростых чисел; имеющийся набор дополняется с последнего значения.
+        progress(готово, всего) вызывается по ходу записи; исключение из него откатывает транзакцию.
+        Возвращает (имя, статистика записи или None при попадании в каталог)"""
+        entry = self.catalog_entry(name) if self._is_current(name) else None
+        have = entry['params']['count'] if entry else 0
+        if have >= count:
+            return name, None
+        digest = [int(entry['content_hash'], 16) if entry else 0]
+        last = int(self.semiprimes_slice(name, have - 1, have)[0]) if have else 0
+
+        if have:
+            # продолжение сканирует только новые значения, без решета до last/2
+            values = DataHandler.scan_semiprimes(last + 1, count=count - have)
+        else:
+            values = DataHandler.iter_semiprimes(count=count)
+
+        # около сотни отчетов (и проверок отмены) на запись при любом count, но не реже чем раз в 10000 строк
+        step = max(1, min(10000, (count - have) // 100))
+
+        def rows():
+            for ordinal, value in enumerate(values, have):
+                digest[0] += self._hash_part(value.to_bytes(8, 'little'))
+                if progress and (ordinal - have) % step == 0:
+                    progress(ordinal - have, count - have)
+                yield value, name, ordinal
+
+        stats = self.bulk_insert('DELETE FROM semiprimes WHERE dataset = ? AND ordinal >= ?',
+                                 'INSERT INTO semiprimes (value, dataset, ordinal) VALUES (?, ?, ?)',
+                                 rows(), delete_params=(name, have))
+        self.register_dataset(name, 'semiprimes', {'count': count}, f'{digest[0] % (1 << 256):064x}', count)
+        return name, stats
+
+    def find_ker(self, x_range, y_range):
+        """Имя актуального набора Ker, окно которого содержит [x0, x1) x [y0, y1), или None"""
+        for name in self.datasets('ker'):
+            if not self._is_current(name):
+                continue
+            extent = self.ker_extent(name)
+            if extent and self._contains(extent, (x_range, y_range)):
+                return name
+        return None
+
+    @staticmethod
+    def _contains(outer, inner):
+        """Окно outer содержит окно inner"""
+        ((ox0, ox1), (oy0, oy1)), ((ix0, ix1), (iy0, iy1)) = outer, inner
+        return ox0 <= ix0 and ix1 <= ox1 and oy0 <= iy0 and iy1 <= oy1
+
+    def ensure_ker(self, x_range, y_range, path=None, workers=1, tile_size=256, progress=None):
+        """Окно Ker в тайлах БД (или в файле path). Набор тайлов, целиком лежащий внутри окна,
+        расширяется: считаются только тайлы новой каймы. Возвращает (имя, статистика или None)"""
+        (x0, x1), (y0, y1) = x_range, y_range
+        name = f'ker:x={x0}..{x1},y={y0}..{y1}'
+        if path is not None:
+            if self._is_current(name):
+                self.ker_pyramid(name)
+                return name, None
+            return name, self._generate_ker_file(name, x_range, y_range, path, workers)
+        covering = self.find_ker(x_range, y_range)
+        if covering is not None:
+            # пирамида обзора строится здесь, в фоновом потоке генерации, а не при открытии вкладки
+            self.ker_pyramid(covering)
+            return covering, None
+        base = None
+        for other in self.datasets('ker'):
+            entry = self.catalog_entry(other)
+            info = self.ker_tile_set(other)
+            if (self._is_current(other) and not entry['path'] and info['tile_size'] == tile_size
+                    and self._contains((x_range, y_range), self.ker_extent(other))
+                    and (base is None or entry['rows'] > base[1]['rows'])):
+                base = other, entry
+        started = time.perf_counter()
+        setup = [('DELETE FROM ker_tiles WHERE dataset = ?', (name,))]
+        if base is not None:
+            # старый набор переходит под новое имя целиком, пересчитывается только кайма
+            old_extent = self.ker_extent(base[0])
+            digest = [int(base[1]['content_hash'], 16)]
+            setup += [('UPDATE ker_tiles SET dataset = ? WHERE dataset = ?', (name, base[0])),
+                      ('DELETE FROM ker_tile_sets WHERE dataset = ?', (base[0],)),
+                      ('DELETE FROM datasets WHERE name = ?', (base[0],))]
+        else:
+            old_extent, digest = None, [0]
+        setup.append(('INSERT OR REPLACE INTO ker_tile_sets VALUES (?, ?, ?, ?, ?, ?)',
+                      (name, x0, y0, x1 - x0, y1 - y0, tile_size)))
+
+        tiles = []
+        for tx in range(x0 // tile_size, -(-x1 // tile_size)):
+            ax0, ax1 = max(x0, tx * tile_size), min(x1, (tx + 1) * tile_size)
+            for ty in range(y0 // tile_size, -(-y1 // tile_size)):
+                ay0, ay1 = max(y0, ty * tile_size), min(y1, (ty + 1) * tile_size)
+                if not (old_extent and self._contains(old_extent, ((ax0, ax1), (ay0, ay1)))):
+                    tiles.append((tx, ty, ax0, ax1, ay0, ay1))
+
+        def rows():
+            blocks = DataHandler.iter_ker_tiles([tile[2:] for tile in tiles], workers)
+            try:
+                for done, ((tx, ty, ax0, ax1, ay0, ay1), block) in enumerate(zip(tiles, blocks)):
+                    if progress:
+                        progress(done, len(tiles))
+                    old = self.conn.execute('''SELECT x0, y0, rows, cols, data FROM ker_tiles
+                        WHERE dataset = ? AND tile_x = ? AND tile_y = ?''', (name, tx, ty)).fetchone()
+                    if old:
+                        digest[0] -= self._hash_part(struct.pack('<qqqq', *old[:4]), old[4])
+                    blob = block.tobytes()
+                    digest[0] += self._hash_part(struct.pack('<qqqq', ax0, ay0, ax1 - ax0, ay1 - ay0), blob)
+                    yield name, tx, ty, ax0, ay0, ax1 - ax0, ay1 - ay0, blob
+            finally:
+                blocks.close()
+
+        self._drop_pyramid(name)
+        if base is not None:
+            self._drop_pyramid(base[0])
+        self.bulk_insert(None, 'INSERT OR REPLACE INTO ker_tiles VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         rows(), chunk_size=64, setup=setup)
+        self.register_dataset(name, 'ker', {'x_range': [x0, x1], 'y_range': [y0, y1]},
+                              f'{digest[0] % (1 << 256):064x}', (x1 - x0) * (y1 - y0))
+        elapsed = time.perf_counter() - started
+        # как и для файла сетки, статистика в ячейках (посчитанных заново), а не в строках тайлов
+        cells = sum((ax1 - ax0) * (ay1 - ay0) for _, _, ax0, ax1, ay0, ay1 in tiles)
+        self.ker_pyramid(name)
+        return name, IngestStats(cells, elapsed, cells / elapsed if elapsed else float('inf'))
+
+    def _generate_ker_file(self, name, x_range, y_range, path, workers):
+        """Генерация окна Ker в файл сетки с записью в каталог"""
+        started = time.perf_counter()
+        self._drop_pyramid(name)
+        data = GridFile.generate(path, x_range, y_range, workers=workers).data
+        digest = hashlib.sha256()
+        for start in range(0, data.shape[0], 4096):
+            digest.update(np.ascontiguousarray(data[start:start + 4096]).tobytes())
+        self.register_dataset(name, 'ker', {'x_range': list(x_range), 'y_range': list(y_range)},
+                              digest.hexdigest(), data.size, path)
+        elapsed = time.perf_counter() - started
+        self.ker_pyramid(name)
+        return IngestStats(data.size, elapsed, data.size / elapsed if elapsed else float('inf'))
+
+class HMMEngine:
+    """Хромоматематические модели над массивами NumPy; out - буфер результата для повторного использования"""
+    @staticmethod
+    def n(data, mod, out=None):
+        """HMM_N: data % mod"""
+        return np.remainder(data, mod, out=out)
+
+    @staticmethod
+    def b(data, base, out=None):
+        """HMM_B: data // base"""
+        return np.floor_divide(data, base, out=out)
+
+    @staticmethod
+    def dn(data, mod, out=None):
+        """HMM_DN: каждая ячейка % mod"""
+        return np.remainder(data, mod, out=out)
+
+    @staticmethod
+    def r(data, a, b, out=None, row_offset=0, chunk_rows=4096):
+        """HMM_R: (a*x + b*y) % 10, x - номер строки (с учётом row_offset), y - значение ячейки"""
+        if out is None:
+            out = np.empty(data.shape, dtype=np.int8)
+        for start in range(0, data.shape[0], chunk_rows):
+            block = data[start:start + chunk_rows].astype(np.int64)
+            block *= b
+            block += a * np.arange(row_offset + start, row_offset + start + len(block), dtype=np.int64)[:, None]
+            np.remainder(block, 10, out=out[start:start + len(block)], casting='unsafe')
+        return out
 
 class HMM:
     """Хромоматематические модели"""
+    @staticmethod
+    def _operand(data, param):
+        """Массив для модели; параметр вне int64 считается по целым Python, как в списочной версии"""
+        if -(1 << 63) <= param < (1 << 63):
+            return np.asarray(data)
+        return np.asarray(data, dtype=object)
+
     @staticmethod
     def hmm_n(data, mod):
         """Модульная арифметика: data[i] % mod"""
-        return [x % mod for x in data]
+        return HMMEngine.n(HMM._operand(data, mod), mod).tolist()
 
     @staticmethod
     def hmm_b(data, base):
         """Биградиентная модель: data[i] // base"""
-        return [x // base for x in data]
+        return HMMEngine.b(HMM._operand(data, base), base).tolist()
 
     @staticmethod
     def hmm_dn(data, mod):
         """Дискретная модель для 2D: каждая ячейка % mod"""
-        return [[v % mod for v in row] for row in data]
+        return HMMEngine.dn(HMM._operand(data, mod), mod).tolist()
 
     @staticmethod
     def hmm_r(data, a, b):
         """Мультиградиентная модель: (a*x + b*y) % 10"""
-        return [[(a * x + b * y) % 10 for y in row] for x, row in enumerate(data)]
+        return HMMEngine.r(np.asarray(data), a, b).tolist()
+
+    @staticmethod
+    def apply_grid(grid, path, model, a, b=0, rows=4096):
+        """Применение HMM_DN/HMM_R к файлу сетки по блокам строк с записью в новый файл"""
+        pipeline = HMMPipeline().dn(a) if model == 'HMM_DN' else HMMPipeline().r(a, b)
+        return pipeline.run(grid, path, chunk_cells=rows * grid.shape[1])
+
+class HMMPipeline:
+    """Цепочка HMM-моделей, выполняемая за один проход: каждый блок строк проходит все шаги подряд"""
+    def __init__(self, steps=()):
+        self.steps = tuple(steps)
+
+    def n(self, mod):
+        return HMMPipeline(self.steps + (('HMM_N', mod),))
+
+    def b(self, base):
+        return HMMPipeline(self.steps + (('HMM_B', base),))
+
+    def dn(self, mod):
+        return HMMPipeline(self.steps + (('HMM_DN', mod),))
+
+    def r(self, a, b):
+        return HMMPipeline(self.steps + (('HMM_R', a, b),))
+
+    def result_dtype(self):
+        """int8, если последний шаг - вычет по модулю не больше 127, иначе int64"""
+        if self.steps:
+            model, *params = self.steps[-1]
+            if model == 'HMM_R' or (model in ('HMM_N', 'HMM_DN') and 0 < params[0] <= 127):
+                return np.dtype(np.int8)
+        return np.dtype(np.int64)
+
+    def apply_block(self, block, out, row_offset=0):
+        """Все шаги над одним блоком: одна рабочая копия int64, дальше только операции на месте"""
+        work = block.astype(np.int64)
+        for model, *params in self.steps:
+            if model in ('HMM_N', 'HMM_DN'):
+                HMMEngine.n(work, params[0], out=work)
+            elif model == 'HMM_B':
+                HMMEngine.b(work, params[0], out=work)
+            else:
+                if work.ndim != 2:
+                    raise ValueError("HMM_R применима только к 2D данным")
+                HMMEngine.r(work, *params, out=work, row_offset=row_offset, chunk_rows=len(work))
+        np.copyto(out, work, casting='unsafe')
+        return out
+
+    def run(self, source, out=None, chunk_cells=1 << 20):
+        """Проход по массиву, memmap или GridFile; out - массив, путь к новому файлу сетки или None"""
+        grid = source if isinstance(source, GridFile) else None
+        data = grid.data if grid else np.asarray(source)
+        result = None
+        if isinstance(out, str):
+            if grid is None:
+                raise ValueError("Запись в файл сетки возможна только для GridFile")
+            result = GridFile.create(out, grid.x_range, grid.y_range)
+            out = result.data
+        elif out is None:
+            out = np.empty(data.shape, dtype=self.result_dtype())
+        row_size = int(np.prod(data.shape[1:], dtype=np.int64))
+        step = max(1, chunk_cells // max(row_size, 1))
+        for start in range(0, data.shape[0], step):
+            self.apply_block(data[start:start + step], out[start:start + step], row_offset=start)
+        if result is not None:
+            result.flush()
+            return result
+        return out
+
+class DistributionStats:
+    """Распределения набора по остаткам и диапазонам: один np.bincount на модуль/базу, результаты кэшируются"""
+    # больше диапазонов соседние сливаются: ширина становится кратной base
+    MAX_BUCKETS = 20
+    # база диапазонов должна помещаться в int64 вместе с данными
+    MAX_BASE = 1 << 63
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.int64).ravel()
+        self.residue_counts = {}
+        self.bucket_counts = {}
+
+    def residues(self, mod):
+        """Число значений с каждым остатком 0..mod-1"""
+        if mod not in self.residue_counts:
+            self.residue_counts[mod] = np.bincount(np.remainder(self.data, mod), minlength=mod)
+        return self.residue_counts[mod]
+
+    def buckets(self, base, limit=None):
+        """(номер первого диапазона, ширина, счётчики диапазонов [k*ширина, (k+1)*ширина) подряд).
+        Ширина - base, либо кратное base, при котором диапазонов не больше limit (по умолчанию MAX_BUCKETS)"""
+        limit = limit or self.MAX_BUCKETS
+        if not 1 <= base < self.MAX_BASE:
+            raise ValueError(f"База должна быть от 1 до {self.MAX_BASE - 1}")
+        if (base, limit) not in self.bucket_counts:
+            if self.data.size == 0:
+                self.bucket_counts[base, limit] = 0, base, np.zeros(0, dtype=np.int64)
+                return self.bucket_counts[base, limit]
+            low, high = int(self.data.min()), int(self.data.max())
+            width = base
+            # число диапазонов считается по min/max до выделения памяти под счётчики
+            while high // width - low // width + 1 > limit:
+                width = base * -(-(high // width - low // width + 1) * (width // base) // limit)
+            first = low // width
+            self.bucket_counts[base, limit] = first, width, np.bincount(np.floor_divide(self.data, width) - first)
+        return self.bucket_counts[base, limit]
+
+class ParameterSweep:
+    """Перебор параметров HMM-модели в пуле процессов. Данные копируются в общую память один раз,
+    воркеры возвращают только сводку: гистограмму значений и число ячеек контурных уровней"""
+    LEVELS = (0, 2, 4, 6, 8)
+    # предел плотной гистограммы; HMM_N/DN/R в него укладываются, HMM_B с малой базой - нет
+    MAX_BINS = 100
+    _shared = None
+
+    def __init__(self, data, workers=None):
+        self.data = np.ascontiguousarray(data, dtype=np.int64)
+        self.workers = workers
+
+    @staticmethod
+    def grid(model):
+        """Полная сетка параметров в пределах, которые проверяют формы"""
+        if model in ('HMM_N', 'HMM_DN'):
+            return [(mod,) for mod in range(2, 101)]
+        if model == 'HMM_B':
+            return [(base,) for base in range(1, 101)]
+        return [(a, b) for a in range(-100, 101) for b in range(-100, 101)]
+
+    @staticmethod
+    def _attach(name, shape):
+        """Инициализатор воркера: представление массива поверх общей памяти"""
+        shm = shared_memory.SharedMemory(name=name)
+        ParameterSweep._shared = shm, np.ndarray(shape, dtype=np.int64, buffer=shm.buf)
+
+    @staticmethod
+    def _summarize(task):
+        """Задача воркера: одна точка сетки параметров"""
+        model, params = task
+        data = ParameterSweep._shared[1]
+        result = HMMPipeline(((model, *params),)).run(data).ravel()
+        low = int(result.min()) if result.size else 0
+        levels = int(np.isin(result, ParameterSweep.LEVELS).sum())
+        return model, params, low, ParameterSweep._histogram(result, low), levels
+
+    @staticmethod
+    def _histogram(result, low):
+        """Плотная гистограмма от минимума, если значений не больше MAX_BINS; иначе ограниченная сводка:
+        MAX_BINS корзин ширины width, число различных значений и децили"""
+        span = int(result.max()) - low + 1 if result.size else 0
+        if span <= ParameterSweep.MAX_BINS:
+            return np.bincount(result - low, minlength=span).tolist()
+        width = -(-span // ParameterSweep.MAX_BINS)
+        return {'width': width,
+                'bins': np.bincount((result - low) // width).tolist(),
+                'distinct': int(np.unique(result).size),
+                'quantiles': np.quantile(result, np.linspace(0, 1, 11), method='lower').astype(int).tolist()}
+
+    def run(self, model, params=None, chunksize=16):
+        """Строки сводки (модель, параметры, минимум, гистограмма от минимума или сводка для широкого
+        диапазона значений, число ячеек уровней)"""
+        params = params if params is not None else self.grid(model)
+        shm = shared_memory.SharedMemory(create=True, size=max(self.data.nbytes, 1))
+        try:
+            np.ndarray(self.data.shape, dtype=np.int64, buffer=shm.buf)[...] = self.data
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=DataHandler.MP_CONTEXT,
+                                     initializer=ParameterSweep._attach,
+                                     initargs=(shm.name, self.data.shape)) as pool:
+                return list(pool.map(ParameterSweep._summarize, [(model, p) for p in params], chunksize=chunksize))
+        finally:
+            shm.close()
+            shm.unlink()
+
+class TransformCache:
+    """LRU-кэш результатов HMM по ключу (хэш данных, модель, параметры): лимит памяти и необязательный
+    дисковый уровень со своим лимитом (вытесняются файлы, к которым дольше всего не обращались)"""
+    def __init__(self, max_bytes=256 << 20, disk_dir=None, max_disk_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.files = OrderedDict()
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            found = []
+            for entry in os.scandir(disk_dir):
+                if entry.name.endswith('.npy') and entry.is_file():
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.path, stat.st_size))
+            for _, path, size in sorted(found):
+                self.files[path] = size
+                self.disk_bytes += size
+            self._trim_disk()
+
+    @staticmethod
+    def data_hash(data):
+        """Хэш содержимого массива (с формой и типом)"""
+        data = np.ascontiguousarray(data)
+        digest = hashlib.sha256(f'{data.dtype.str}{data.shape}'.encode())
+        digest.update(data.data)
+        return digest.hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha256(repr(key).encode()).hexdigest() + '.npy')
+
+    def get(self, key):
+        """Результат из памяти или с диска (None, если его нет)"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        path = self._disk_path(key) if self.disk_dir else None
+        if path and path in self.files:
+            try:
+                value = np.load(path)
+                os.utime(path)
+            except (OSError, ValueError, EOFError):
+                # поврежденный или удаленный файл - просто промах кэша
+                self._forget_file(path)
+                return None
+            with self.lock:
+                self.files.move_to_end(path)
+            self._remember(key, value)
+            return value
+        return None
+
+    def put(self, key, value):
+        """Сохранение копии результата (буферы out переиспользуются вызывающей стороной)"""
+        value = np.array(value, copy=True)
+        value.setflags(write=False)
+        self._remember(key, value)
+        if self.disk_dir and value.nbytes <= self.max_disk_bytes:
+            self._save_file(self._disk_path(key), value)
+        return value
+
+    def _save_file(self, path, value):
+        """Запись через временный файл, чтобы читатель не увидел недописанный .npy"""
+        temp = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp, 'wb') as f:
+                np.save(f, value)
+            os.replace(temp, path)
+        except OSError:
+            if os.path.exists(temp):
+                os.remove(temp)
+            return
+        size = os.path.getsize(path)
+        with self.lock:
+            self.disk_bytes += size - self.files.pop(path, 0)
+            self.files[path] = size
+        self._trim_disk()
+
+    def _trim_disk(self):
+        while True:
+            with self.lock:
+                if self.disk_bytes <= self.max_disk_bytes or not self.files:
+                    return
+                path = next(iter(self.files))
+            self._forget_file(path)
+
+    def _forget_file(self, path):
+        with self.lock:
+            self.disk_bytes -= self.files.pop(path, 0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _remember(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key).nbytes
+            self.entries[key] = value
+            self.nbytes += value.nbytes
+            while self.nbytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def get_or_compute(self, key, compute):
+        """Результат из кэша, иначе compute() с сохранением в кэш"""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+class RasterRenderer:
+    """Растровая отрисовка матриц по палитре: одна картинка tk.PhotoImage вместо элемента холста на ячейку"""
+    @staticmethod
+    def palette(color_map, default='#ffffff'):
+        """Таблица RGB для значений 0..255; последняя строка - цвет прочих значений"""
+        lut = np.empty((257, 3), dtype=np.uint8)
+        lut[:] = RasterRenderer.rgb(default)
+        for value, color in color_map.items():
+            if 0 <= value < 256:
+                lut[value] = RasterRenderer.rgb(color)
+        return lut
+
+    @staticmethod
+    def rgb(color):
+        return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+    @staticmethod
+    def fit_scale(shape, size):
+        """Целый масштаб ячейки, при котором матрица помещается в size пикселей"""
+        return max(1, size // max(shape[0], shape[1], 1))
+
+    @staticmethod
+    def pixels(data, lut, scale=1):
+        """Массив RGB (строки - y, столбцы - x, как у data[x][y] на холсте), увеличенный в scale раз"""
+        data = np.asarray(data).T.astype(np.intp)
+        index = np.where((data >= 0) & (data < 256), data, 256)
+        image = lut[index]
+        if scale > 1:
+            image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+        return image
+
+    @staticmethod
+    def ppm(image):
+        """Двоичный PPM (P6) из массива RGB"""
+        height, width = image.shape[:2]
+        return b'P6 %d %d 255\n' % (width, height) + np.ascontiguousarray(image).tobytes()
+
+class RasterView:
+    """Картинка на холсте, которая между кадрами живет дальше: перезаписывается только изменившийся прямоугольник"""
+    def __init__(self, canvas, x=0, y=0, anchor=tk.NW):
+        self.canvas = canvas
+        self.position = (x, y)
+        self.anchor = anchor
+        self.photo = None
+        self.item = None
+        self.pixels = None
+
+    def show(self, pixels):
+        """Вывод массива RGB; возвращает False, если кадр совпал с предыдущим"""
+        if self.pixels is None or self.pixels.shape != pixels.shape:
+            self.photo = tk.PhotoImage(master=self.canvas, data=RasterRenderer.ppm(pixels), format='PPM')
+            if self.item is None:
+                self.item = self.canvas.create_image(*self.position, anchor=self.anchor, image=self.photo)
+            else:
+                self.canvas.itemconfigure(self.item, image=self.photo)
+        else:
+            box = self.changed_box(self.pixels, pixels)
+            if box is None:
+                return False
+            top, bottom, left, right = box
+            self.photo.tk.call(self.photo.name, 'put', RasterRenderer.ppm(pixels[top:bottom, left:right]),
+                               '-format', 'ppm', '-to', left, top)
+        self.pixels = pixels
+        return True
+
+    @staticmethod
+    def changed_box(old, new):
+        """Ограничивающий прямоугольник (top, bottom, left, right) отличий двух кадров или None"""
+        diff = (old != new).any(axis=2)
+        rows = np.flatnonzero(diff.any(axis=1))
+        if len(rows) == 0:
+            return None
+        cols = np.flatnonzero(diff.any(axis=0))
+        return int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+
+class PieView:
+    """Круговая диаграмма на холсте: элементы секторов живут между кадрами, меняются только сдвинувшиеся"""
+    def __init__(self, canvas, legend_frame, box=(50, 50, 350, 350)):
+        self.canvas = canvas
+        self.legend_frame = legend_frame
+        self.box = box
+        self.arcs = []
+        self.labels = None
+
+    def show(self, counts, colors):
+        """Перенастройка секторов под счётчики counts; лишние удаляются, недостающие создаются"""
+        while len(self.arcs) > len(counts):
+            self.canvas.delete(self.arcs.pop()[0])
+        while len(self.arcs) < len(counts):
+            self.arcs.append((self.canvas.create_arc(*self.box, start=0, extent=0), None))
+        total = max(int(np.sum(counts)), 1)
+        start_angle = 0
+        for i, count in enumerate(counts):
+            angle = 360 * count / total
+            item, previous = self.arcs[i]
+            current = (start_angle, angle, colors[i])
+            if current != previous:
+                self.canvas.itemconfigure(item, start=start_angle, extent=angle, fill=colors[i])
+                self.arcs[i] = (item, current)
+            start_angle += angle
+
+class UlamSpiral:
+    """Координаты спирали Улама в замкнутой форме и растровая отрисовка классов точек"""
+    EMPTY, OTHER, SEMIPRIME = 0, 1, 2
+    _coords = None
+
+    @staticmethod
+    def positions(indices):
+        """Координаты (x, y) точек спирали с номерами indices без пошагового обхода.
+
+        Отрезки имеют длины 1, 1, 2, 2, 3, 3, ...; после 2m отрезков (номер m(m+1))
+        точка стоит в углу (c, -c), c = +-ceil(m/2), дальше m+1 шагов по y и m+1 по x.
+        """
+        n = np.asarray(indices, dtype=np.int64)
+        m = ((np.sqrt(4 * n.astype(np.float64) + 1) - 1) // 2).astype(np.int64)
+        m -= m * (m + 1) > n
+        m += (m + 1) * (m + 2) <= n
+        t = n - m * (m + 1)
+        sign = np.where(m % 2 == 1, 1, -1)
+        corner = sign * ((m + 1) // 2)
+        first_leg = np.minimum(t, m + 1)
+        x = corner - sign * (t - first_leg)
+        y = -corner + sign * first_leg
+        return x, y
+
+    @classmethod
+    def coords(cls, count):
+        """Координаты первых count точек; общий кэш растет до наибольшего запрошенного размера"""
+        if cls._coords is None or len(cls._coords[0]) < count:
+            cls._coords = cls.positions(np.arange(count, dtype=np.int64))
+        x, y = cls._coords
+        return x[:count], y[:count]
+
+    @classmethod
+    def grid(cls, flags):
+        """Матрица классов [x][y] квадрата, покрывающего точки спирали, с центром в середине"""
+        flags = np.asarray(flags, dtype=bool)
+        x, y = cls.coords(len(flags))
+        radius = int(max(np.abs(x).max(initial=0), np.abs(y).max(initial=0)))
+        grid = np.full((2 * radius + 1, 2 * radius + 1), cls.EMPTY, dtype=np.uint8)
+        grid[x + radius, y + radius] = np.where(flags, cls.SEMIPRIME, cls.OTHER)
+        return grid
+
+    @staticmethod
+    def reduce(grid, factor):
+        """Уменьшение матрицы блоками factor x factor; полупростые числа в блоке имеют приоритет"""
+        if factor <= 1:
+            return grid
+        rows = -(-grid.shape[0] // factor) * factor
+        cols = -(-grid.shape[1] // factor) * factor
+        padded = np.zeros((rows, cols), dtype=grid.dtype)
+        padded[:grid.shape[0], :grid.shape[1]] = grid
+        return padded.reshape(rows // factor, factor, cols // factor, factor).max(axis=(1, 3))
+
+    @classmethod
+    def raster(cls, flags, size):
+        """Матрица классов, вписанная в size пикселей, и целый масштаб ячейки"""
+        grid = cls.grid(flags)
+        factor = -(-grid.shape[0] // size)
+        grid = cls.reduce(grid, factor)
+        return grid, RasterRenderer.fit_scale(grid.shape, size)
+
+class TilePyramid:
+    """Пирамида уровней детализации категориальной матрицы [x][y]. Уровень k - мода блоков 2x2 уровня k-1.
+    Уровни k >= 1 строятся один раз (build_levels) и хранятся целиком: в памяти или в файлах рядом с данными.
+    LRU-кэш с ограничением по памяти держит только тайлы уровня 0, прочитанные через read"""
+    BAND_CELLS = 1 << 24
+
+    def __init__(self, shape, read, levels, tile=256, max_bytes=64 << 20):
+        self.shape = tuple(shape)
+        self.read = read
+        self.stored = list(levels)
+        self.tile = tile
+        self.max_bytes = max_bytes
+        self.cache = OrderedDict()
+        self.size = 0
+        self.levels = 1 + len(self.stored)
+
+    @classmethod
+    def from_array(cls, data, tile=256, **kwargs):
+        """Пирамида над массивом в памяти: уровни строятся сразу"""
+        def read(x0, x1, y0, y1):
+            return data[x0:x1, y0:y1]
+        levels = cls.build_levels(data.shape, read, lambda level, shape: np.empty(shape, dtype=data.dtype), tile)
+        return cls(data.shape, read, levels, tile=tile, **kwargs)
+
+    @staticmethod
+    def level_count(shape, tile=256):
+        """Число уровней: последний целиком помещается в один тайл"""
+        rows, cols = shape
+        levels = 1
+        while max(rows, cols) > tile:
+            rows, cols = -(-rows // 2), -(-cols // 2)
+            levels += 1
+        return levels
+
+    @classmethod
+    def build_levels(cls, shape, read, alloc, tile=256):
+        """Уровни 1.. по полосам строк: каждый уровень читается из уже построенного предыдущего.
+        alloc(level, shape) выделяет массив под уровень (в памяти или memmap файла)"""
+        levels = []
+        rows, cols = shape
+        while max(rows, cols) > tile:
+            out = alloc(len(levels) + 1, (-(-rows // 2), -(-cols // 2)))
+            # четная высота полосы: блоки 2x2 не разрываются между полосами
+            band = max(2, (cls.BAND_CELLS // cols) & ~1)
+            for x0 in range(0, rows, band):
+                block = np.asarray(read(x0, min(x0 + band, rows), 0, cols))
+                out[x0 // 2:x0 // 2 + -(-block.shape[0] // 2)] = cls.downsample(block)
+            levels.append(out)
+            rows, cols = out.shape
+            read = lambda x0, x1, y0, y1, src=out: src[x0:x1, y0:y1]
+        return levels
+
+    def level_shape(self, level):
+        return self.shape if level == 0 else self.stored[level - 1].shape
+
+    def tile_at(self, tx, ty):
+        """Тайл (tx, ty) уровня 0"""
+        key = (tx, ty)
+        tile = self.cache.get(key)
+        if tile is not None:
+            self.cache.move_to_end(key)
+            return tile
+        t = self.tile
+        rows, cols = self.shape
+        tile = np.array(self.read(tx * t, min((tx + 1) * t, rows), ty * t, min((ty + 1) * t, cols)))
+        self.cache[key] = tile
+        self.size += tile.nbytes
+        while self.size > self.max_bytes and len(self.cache) > 1:
+            _, old = self.cache.popitem(last=False)
+            self.size -= old.nbytes
+        return tile
+
+    @staticmethod
+    def downsample(block):
+        """Мода каждого блока 2x2 (при равенстве голосов - левый верхний элемент); нечетный край дублируется"""
+        block = np.pad(block, ((0, block.shape[0] % 2), (0, block.shape[1] % 2)), mode='edge')
+        q0, q1, q2, q3 = block[0::2, 0::2], block[1::2, 0::2], block[0::2, 1::2], block[1::2, 1::2]
+        # q0 побеждает, если встречается дважды или все четыре различны; иначе первая повторяющаяся пара
+        second = (q1 == q2) | (q1 == q3)
+        third = (q2 == q3) & ~second
+        first = (q0 == q1) | (q0 == q2) | (q0 == q3) | ~(second | third)
+        return np.where(first, q0, np.where(second, q1, q2))
+
+    def window(self, level, x0, y0, rows, cols, fill=-1):
+        """Окно [x0, x0+rows) x [y0, y0+cols) уровня level; вне матрицы - fill"""
+        out = np.full((rows, cols), fill, dtype=np.int16)
+        height, width = self.level_shape(level)
+        ax0, ax1 = max(x0, 0), min(x0 + rows, height)
+        ay0, ay1 = max(y0, 0), min(y0 + cols, width)
+        if ax0 >= ax1 or ay0 >= ay1:
+            return out
+        if level:
+            out[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = self.stored[level - 1][ax0:ax1, ay0:ay1]
+            return out
+        t = self.tile
+        for tx in range(ax0 // t, -(-ax1 // t)):
+            for ty in range(ay0 // t, -(-ay1 // t)):
+                tile = self.tile_at(tx, ty)
+                bx0, bx1 = max(ax0, tx * t), min(ax1, tx * t + tile.shape[0])
+                by0, by1 = max(ay0, ty * t), min(ay1, ty * t + tile.shape[1])
+                out[bx0 - x0:bx1 - x0, by0 - y0:by1 - y0] = tile[bx0 - tx * t:bx1 - tx * t, by0 - ty * t:by1 - ty * t]
+        return out
+
+class ZoomView:
+    """Масштабируемый (колесо мыши) и перемещаемый (перетаскивание) просмотр пирамиды на холсте.
+    Масштаб 2**zoom пикселей на ячейку: при zoom < 0 берется уровень пирамиды -zoom"""
+    MAX_ZOOM = 4
+
+    def __init__(self, canvas, pyramid, palette, width, height, on_change=None):
+        self.canvas = canvas
+        self.pyramid = pyramid
+        self.palette = palette
+        self.width, self.height = width, height
+        self.on_change = on_change
+        self.view = RasterView(canvas)
+        self.center = [pyramid.shape[0] / 2, pyramid.shape[1] / 2]
+        fit = min(width / pyramid.shape[0], height / pyramid.shape[1])
+        self.zoom = self.clamp(math.floor(math.log2(fit)))
+        self.drag = None
+        self.job = None
+        canvas.bind('<MouseWheel>', lambda event: self.zoom_at(1 if event.delta > 0 else -1, event.x, event.y))
+        canvas.bind('<Button-4>', lambda event: self.zoom_at(1, event.x, event.y))
+        canvas.bind('<Button-5>', lambda event: self.zoom_at(-1, event.x, event.y))
+        canvas.bind('<ButtonPress-1>', self.start_drag)
+        canvas.bind('<B1-Motion>', self.move_drag)
+
+    def clamp(self, zoom):
+        return max(1 - self.pyramid.levels, min(self.MAX_ZOOM, zoom))
+
+    def zoom_at(self, step, px, py):
+        """Смена масштаба с неподвижной точкой под курсором"""
+        zoom = self.clamp(self.zoom + step)
+        if zoom == self.zoom:
+            return
+        old, new = 2.0 ** self.zoom, 2.0 ** zoom
+        self.center[0] += (px - self.width / 2) * (1 / old - 1 / new)
+        self.center[1] += (py - self.height / 2) * (1 / old - 1 / new)
+        self.zoom = zoom
+        self.schedule()
+
+    def start_drag(self, event):
+        self.drag = (event.x, event.y)
+
+    def move_drag(self, event):
+        if self.drag is None:
+            return
+        scale = 2.0 ** self.zoom
+        self.center[0] -= (event.x - self.drag[0]) / scale
+        self.center[1] -= (event.y - self.drag[1]) / scale
+        self.drag = (event.x, event.y)
+        self.schedule()
+
+    def schedule(self):
+        """Серия событий мыши сводится к одной перерисовке в ближайший простой цикла Tk"""
+        if self.job is None:
+            self.job = self.canvas.after_idle(self.render)
+
+    def render(self):
+        """Отрисовка только видимых тайлов текущего уровня"""
+        self.job = None
+        level, scale = max(0, -self.zoom), 1 << max(0, self.zoom)
+        rows, cols = -(-self.width // scale), -(-self.height // scale)
+        x0 = math.floor(self.center[0] / (1 << level) - rows / 2)
+        y0 = math.floor(self.center[1] / (1 << level) - cols / 2)
+        window = self.pyramid.window(level, x0, y0, rows, cols)
+        self.view.show(RasterRenderer.pixels(window, self.palette, scale)[:self.height, :self.width])
+        if self.on_change:
+            self.on_change(self)
+
+class GenerationCancelled(Exception):
+    """Генерация отменена пользователем"""
+
+class GenerationWorker(threading.Thread):
+    """Фоновая генерация наборов: своё соединение из пула БД, прогресс и результат через очередь"""
+    def __init__(self, db, count, x_range, y_range, workers=None):
+        super().__init__(daemon=True)
+        self.db = db
+        self.count = count
+        self.x_range = x_range
+        self.y_range = y_range
+        self.workers = workers
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _progress(self, stage, offset):
+        """Обратный вызов для Database: доля этапа пересчитывается в общую долю (два этапа по 50%)"""
+        def report(done, total):
+            if self.cancel_event.is_set():
+                raise GenerationCancelled()
+            self.messages.put(('progress', stage, offset + 50 * done / max(total, 1)))
+        return report
+
+    def run(self):
+        """Этапы идут отдельными транзакциями: отмена откатывает только текущий этап,
+        завершенные наборы остаются в каталоге и используются следующим запуском"""
+        db = self.db
+        try:
+            dataset_1d, stats_1d = db.ensure_semiprimes(
+                self.count, progress=self._progress("Полупростые числа", 0))
+            dataset_2d, stats_2d = db.ensure_ker(
+                self.x_range, self.y_range, workers=self.workers, progress=self._progress("Матрица Ker", 50))
+            self.messages.put(('done', ((dataset_1d, stats_1d), (dataset_2d, stats_2d))))
+        except GenerationCancelled:
+            self.messages.put(('cancelled', None))
+        except Exception as e:
+            self.messages.put(('error', e))
+        finally:
+            db.pool.release()
 
 class MainApp(tk.Tk):
+    SEMIPRIME_COUNT = 1000
+    KER_WINDOW = ((-50, 50), (-50, 50))
+    PIE_LEGEND_LIMIT = 20
+    # пауза после последней правки параметра перед пересчетом
+    DEBOUNCE_MS = 250
+    HEATMAP_COLORS = {
+        0: '#2ecc71', 1: '#3498db', 2: '#e74c3c',
+        3: '#f1c40f', 4: '#9b59b6', 5: '#34495e',
+        6: '#FF00FF', 7: '#00FFFF', 8: '#FFA500', 9: '#808080'
+    }
+    HEATMAP_PALETTE = RasterRenderer.palette(HEATMAP_COLORS)
+    CONTOUR_LEVELS = [0, 2, 4, 6, 8]
+    CONTOUR_PALETTE = RasterRenderer.palette({level: '#2c3e50' for level in CONTOUR_LEVELS})
+    SPIRAL_PALETTE = RasterRenderer.palette({UlamSpiral.OTHER: '#f0f0f0', UlamSpiral.SEMIPRIME: '#e74c3c'})
+
     def __init__(self):
         super().__init__()
         self.title("Хромоматематическое моделирование")
@@ -103,12 +1761,20 @@ class MainApp(tk.Tk):
         self.db = Database()
         self.create_menu()
         self.create_welcome_screen()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.style = ttk.Style()
         self.style.configure('TFrame', background='#f0f0f0')
         self.style.configure('TButton', font=('Arial', 10))
         self.style.configure('TLabel', font=('Arial', 10))
         self.window_1d = None
         self.window_2d = None
+        self.dataset_1d = 'semiprimes'
+        self.worker = None
+        self.transform_cache = TransformCache(disk_dir='data/cache', max_disk_bytes=64 << 20)
+        self.debounce_jobs = {}
+        self.pending_tabs = {}
+        self.spiral_view = self.pie_view = None
+        self.heatmap_view = self.contour_view = self.overview_view = None
         
     def create_welcome_screen(self):
         """Улучшенный экран приветствия"""
@@ -164,23 +1830,101 @@ class MainApp(tk.Tk):
         
         self.config(menu=menu)
 
+    def on_close(self):
+        """Завершение: остановка фоновой генерации и закрытие БД"""
+        if self.worker and self.worker.is_alive():
+            self.worker.cancel()
+            self.worker.join()
+        self.db.close()
+        self.destroy()
+
     def generate_data(self):
         """Генерация данных с проверкой"""
         confirm = messagebox.askyesno("Подтверждение", 
             "Генерация новых данных займет некоторое время.\nПродолжить?")
         if not confirm: return
+        if self.worker and self.worker.is_alive():
+            messagebox.showwarning("Генерация", "Генерация уже выполняется")
+            return
         
-        semiprimes = DataHandler.generate_semiprimes(1000)
-        self.db.save_semiprimes(semiprimes)
+        self.progress_window = tk.Toplevel(self)
+        self.progress_window.title("Генерация данных")
+        self.progress_window.resizable(False, False)
+        self.progress_label = ttk.Label(self.progress_window, text="Подготовка...", width=40)
+        self.progress_label.pack(padx=10, pady=(10, 5))
+        self.progress_bar = ttk.Progressbar(self.progress_window, length=300, maximum=100)
+        self.progress_bar.pack(padx=10, pady=5)
+        cancel_button = ttk.Button(self.progress_window, text="Отмена", command=self.cancel_generation)
+        cancel_button.pack(pady=(5, 10))
+        self.progress_window.protocol("WM_DELETE_WINDOW", self.cancel_generation)
         
-        data = []
-        for x in range(-50, 50):
-            row = []
-            for y in range(-50, 50):
-                row.append(DataHandler.ker(x*y - (x+y)))
-            data.append(row)
-        self.db.save_ker_values(data)
-        messagebox.showinfo("Успех", "Данные успешно сгенерированы!\nДоступно:\n- 1000 полупростых чисел\n- 100x100 матрица значений Ker")
+        self.worker = GenerationWorker(self.db, self.SEMIPRIME_COUNT, *self.KER_WINDOW)
+        self.worker.start()
+        self.after(100, self.poll_generation)
+
+    def cancel_generation(self):
+        """Запрос отмены фоновой генерации"""
+        if self.worker:
+            self.worker.cancel()
+            self.progress_label.config(text="Отмена...")
+
+    def poll_generation(self):
+        """Опрос очереди фоновой генерации из главного цикла Tk"""
+        while True:
+            try:
+                kind, *payload = self.worker.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                stage, percent = payload
+                self.progress_label.config(text=stage)
+                self.progress_bar['value'] = percent
+                continue
+            self.progress_window.destroy()
+            if kind == 'done':
+                (self.dataset_1d, stats_1d), (dataset_2d, stats_2d) = payload[0]
+                report = [f"{name}: " + (f"{stats.rows_per_sec:,.0f} {unit}/с" if stats else "из каталога")
+                          for name, stats, unit in ((self.dataset_1d, stats_1d, "чисел"), (dataset_2d, stats_2d, "ячеек"))]
+                (x0, x1), (y0, y1) = self.KER_WINDOW
+                messagebox.showinfo("Успех", f"Данные успешно сгенерированы!\nДоступно:\n- {self.SEMIPRIME_COUNT} полупростых чисел"
+                                    f"\n- {x1 - x0}x{y1 - y0} матрица значений Ker\n\n" + "\n".join(report))
+            elif kind == 'cancelled':
+                messagebox.showinfo("Генерация", "Генерация отменена: текущий этап откатан, готовые наборы сохранены")
+            else:
+                messagebox.showerror("Ошибка", f"Ошибка генерации: {payload[0]}")
+            return
+        self.after(100, self.poll_generation)
+
+    def debounce(self, key, callback):
+        """Вызов callback через DEBOUNCE_MS мс; новый запрос с тем же ключом откладывает предыдущий"""
+        job = self.debounce_jobs.pop(key, None)
+        if job is not None:
+            self.after_cancel(job)
+        self.debounce_jobs[key] = self.after(self.DEBOUNCE_MS, self.run_debounced, key, callback)
+
+    def run_debounced(self, key, callback):
+        self.debounce_jobs.pop(key, None)
+        callback()
+
+    def create_notebook(self, parent, key):
+        """Блокнот формы key с отложенной отрисовкой: вкладка рисуется, только когда она видна"""
+        notebook = ttk.Notebook(parent)
+        self.pending_tabs[key] = notebook, {}
+        notebook.bind('<<NotebookTabChanged>>', lambda event: self.render_selected(key))
+        return notebook
+
+    def invalidate_tabs(self, key, renders):
+        """Помечает вкладки формы key устаревшими; выбранная перерисовывается сразу, остальные - при переходе на них"""
+        notebook, pending = self.pending_tabs[key]
+        pending.update((str(frame), render) for frame, render in renders.items())
+        self.render_selected(key)
+
+    def render_selected(self, key):
+        """Отрисовка выбранной вкладки формы key, если она устарела"""
+        notebook, pending = self.pending_tabs[key]
+        render = pending.pop(str(notebook.select()), None)
+        if render is not None:
+            render()
 
     # 1D Визуализации
     def open_1d(self):
@@ -188,10 +1932,15 @@ class MainApp(tk.Tk):
         if self.window_1d:
             self.window_1d.destroy()
         self.window_1d = tk.Toplevel(self)
+        self.spiral_view = self.pie_view = None
         self.window_1d.title("1D: Анализ полупростых чисел")
         
-        self.db.cursor.execute("SELECT value FROM semiprimes")
-        self.data_1d = [row[0] for row in self.db.cursor.fetchall()]
+        self.data_1d = self.db.semiprimes_slice(self.dataset_1d, 0, self.SEMIPRIME_COUNT)
+        if len(self.data_1d) == 0:
+            self.data_1d = self.db.semiprimes_slice('default', 0, self.SEMIPRIME_COUNT)
+        self.buffer_1d = np.empty_like(self.data_1d)
+        self.hash_1d = TransformCache.data_hash(self.data_1d)
+        self.stats_1d = DistributionStats(self.data_1d)
         
         control_frame = ttk.Frame(self.window_1d)
         control_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -208,21 +1957,35 @@ class MainApp(tk.Tk):
         self.param_1d_entry.grid(row=0, column=3, padx=5)
         
         ttk.Button(control_frame, text="Применить", command=self.update_1d_viz).grid(row=0, column=4, padx=5)
+        model_combobox.bind('<<ComboboxSelected>>', lambda event: self.debounce('1d', self.live_update_1d))
+        self.param_1d_entry.bind('<KeyRelease>', lambda event: self.debounce('1d', self.live_update_1d))
         
-        self.tab_control_1d = ttk.Notebook(self.window_1d)
+        self.tab_control_1d = self.create_notebook(self.window_1d, '1d')
         
         self.spiral_frame = ttk.Frame(self.tab_control_1d)
-        self.draw_ulam_spiral(self.spiral_frame, self.data_1d)
         self.tab_control_1d.add(self.spiral_frame, text="Спираль Улама")
         
         self.pie_frame = ttk.Frame(self.tab_control_1d)
-        self.draw_pie_chart(self.pie_frame, self.data_1d)
         self.tab_control_1d.add(self.pie_frame, text="Распределение")
         
         self.tab_control_1d.pack(expand=1, fill="both", padx=10, pady=10)
+        self.invalidate_tabs('1d', {
+            self.spiral_frame: lambda: self.draw_ulam_spiral(self.spiral_frame, self.data_1d),
+            self.pie_frame: lambda: self.draw_pie_chart(self.pie_frame, self.stats_1d.residues(5)),
+        })
 
     def draw_ulam_spiral(self, parent, data):
-        """Улучшенная отрисовка спирали Улама"""
+        """Спираль Улама; холст и легенда создаются один раз, дальше обновляется только картинка"""
+        if self.spiral_view is None:
+            self.spiral_view = self.build_ulam_spiral(parent)
+        data = np.asarray(data, dtype=np.int64)
+        limit = int(data.max(initial=0)) + 1
+        flags = SemiprimeIndex.covering(limit).is_semiprime_batch(data)
+        grid, step = UlamSpiral.raster(flags, 500)
+        self.spiral_view.show(RasterRenderer.pixels(grid, self.SPIRAL_PALETTE, step))
+
+    def build_ulam_spiral(self, parent):
+        """Холст, легенда и описание спирали Улама"""
         for widget in parent.winfo_children():
             widget.destroy()
         
@@ -231,39 +1994,7 @@ class MainApp(tk.Tk):
         
         canvas = tk.Canvas(main_frame, width=600, height=500, bg='white')
         canvas.pack(pady=10)
-        
-        x, y = 0, 0
-        dx, dy = 0, -1
-        step = 10
-        max_steps = 1
-        steps = 0
-        turns = 0
-        center = 250
-
-        for num in data:
-            is_semiprime = DataHandler.is_semiprime(num)
-            color = "#e74c3c" if is_semiprime else "#f0f0f0"
-        
-            if -center//step < x < center//step and -center//step < y < center//step:
-                canvas.create_oval(
-                    center + x*step - 3,
-                    center + y*step - 3,
-                    center + x*step + 3,
-                    center + y*step + 3,
-                    fill=color, 
-                    outline=""
-                )
-            
-            if steps >= max_steps:
-                steps = 0
-                dx, dy = -dy, dx
-                turns += 1
-                if turns % 2 == 0:
-                    max_steps += 1
-            
-            x += dx
-            y += dy
-            steps += 1
+        view = RasterView(canvas, 250, 250, anchor=tk.CENTER)
 
         legend_frame = ttk.Frame(main_frame)
         legend_frame.pack(pady=5)
@@ -283,9 +2014,38 @@ class MainApp(tk.Tk):
             • Параметры управления: модуль/база в панели управления
         """
         ttk.Label(desc_frame, text=text, wraplength=580, justify=tk.LEFT).pack()
+        return view
 
-    def draw_pie_chart(self, parent, data):
-        """Улучшенная круговая диаграмма"""
+    def draw_pie_chart(self, parent, counts, labels=None):
+        """Круговая диаграмма по готовым счётчикам (DistributionStats); секторы и легенда переиспользуются"""
+        if self.pie_view is None:
+            self.pie_view = self.build_pie_chart(parent)
+        labels = labels or [f"mod {i}" for i in range(len(counts))]
+        colors = self.pie_colors(len(counts))
+        self.pie_view.show(counts, colors)
+        if self.pie_view.labels != labels:
+            self.fill_pie_legend(self.pie_view.legend_frame, colors, labels)
+            self.pie_view.labels = labels
+
+    def fill_pie_legend(self, legend_frame, colors, labels):
+        """Перестройка легенды диаграммы (только при смене набора секторов)"""
+        for widget in legend_frame.winfo_children():
+            widget.destroy()
+        ttk.Label(legend_frame, text="Распределение по модулю:", font=('Arial', 9, 'bold')).pack()
+        shown = min(len(labels), self.PIE_LEGEND_LIMIT)
+        for start in range(0, shown, 10):
+            row = ttk.Frame(legend_frame)
+            row.pack()
+            for i in range(start, min(start + 10, shown)):
+                frame = ttk.Frame(row)
+                frame.pack(side=tk.LEFT, padx=5)
+                tk.Canvas(frame, width=20, height=20, bg=colors[i]).pack()
+                ttk.Label(frame, text=labels[i]).pack()
+        if len(labels) > shown:
+            ttk.Label(legend_frame, text=f"... ещё {len(labels) - shown}").pack()
+
+    def build_pie_chart(self, parent):
+        """Холст, рамка легенды и описание круговой диаграммы"""
         for widget in parent.winfo_children():
             widget.destroy()
         
@@ -295,26 +2055,9 @@ class MainApp(tk.Tk):
         canvas = tk.Canvas(main_frame, width=400, height=400, bg='white')
         canvas.pack(pady=10)
         
-        mod = 5
-        counts = [0]*mod
-        for num in data:
-            counts[num % mod] += 1
-        
-        colors = ['#e74c3c', '#3498db', '#2ecc71', '#f1c40f', '#9b59b6']
-        start_angle = 0
-        for i, count in enumerate(counts):
-            angle = 360 * count / len(data)
-            canvas.create_arc(50, 50, 350, 350, start=start_angle, extent=angle, fill=colors[i])
-            start_angle += angle
-        
         legend_frame = ttk.Frame(main_frame)
         legend_frame.pack(pady=5)
-        ttk.Label(legend_frame, text="Распределение по модулю:", font=('Arial', 9, 'bold')).pack()
-        for i, color in enumerate(colors[:mod]):
-            frame = ttk.Frame(legend_frame)
-            frame.pack(side=tk.LEFT, padx=5)
-            tk.Canvas(frame, width=20, height=20, bg=color).pack()
-            ttk.Label(frame, text=f"mod {i}").pack()
+        view = PieView(canvas, legend_frame)
         
         desc_frame = ttk.Frame(main_frame)
         desc_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -326,6 +2069,15 @@ class MainApp(tk.Tk):
             • Модель HMM_B: группировка чисел по диапазонам (base)
         """
         ttk.Label(desc_frame, text=text, wraplength=580, justify=tk.LEFT).pack()
+        return view
+
+    @staticmethod
+    def pie_colors(n):
+        """Цвета секторов: исходные пять, дальше равномерно по оттенку"""
+        base = ['#e74c3c', '#3498db', '#2ecc71', '#f1c40f', '#9b59b6']
+        extra = ['#%02x%02x%02x' % tuple(int(255 * c) for c in colorsys.hsv_to_rgb(i / max(n - 5, 1), 0.6, 0.9))
+                 for i in range(max(n - 5, 0))]
+        return (base + extra)[:n]
 
     # 2D Визуализации
     def open_2d(self):
@@ -333,13 +2085,19 @@ class MainApp(tk.Tk):
         if self.window_2d:
             self.window_2d.destroy()
         self.window_2d = tk.Toplevel(self)
+        self.heatmap_view = self.contour_view = self.overview_view = None
         self.window_2d.title("2D: Анализ Ker(X*Y - X+Y)")
         
-        self.db.cursor.execute("SELECT x, y, value FROM ker_values")
-        raw_data = self.db.cursor.fetchall()
-        self.data_2d = [[0]*100 for _ in range(100)]
-        for x, y, v in raw_data:
-            self.data_2d[x][y] = v
+        (x0, x1), (y0, y1) = self.KER_WINDOW
+        view = (x0, min(x1, x0 + 100)), (y0, min(y1, y0 + 100))
+        name = self.db.find_ker(*view)
+        self.dataset_2d = name
+        if name is not None:
+            self.data_2d = self.db.ker_window(name, *view)
+        else:
+            self.data_2d = np.array(self.db.load_ker_values(), dtype=np.int8)
+        self.buffer_2d = np.empty_like(self.data_2d)
+        self.hash_2d = TransformCache.data_hash(self.data_2d)
         
         control_frame = ttk.Frame(self.window_2d)
         control_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -361,21 +2119,107 @@ class MainApp(tk.Tk):
         self.param_b_entry.grid(row=0, column=5, padx=5)
         
         ttk.Button(control_frame, text="Применить", command=self.update_2d_viz).grid(row=0, column=6, padx=5)
+        model_combobox.bind('<<ComboboxSelected>>', lambda event: self.debounce('2d', self.live_update_2d))
+        for entry in (self.param_a_entry, self.param_b_entry):
+            entry.bind('<KeyRelease>', lambda event: self.debounce('2d', self.live_update_2d))
         
-        self.tab_control_2d = ttk.Notebook(self.window_2d)
+        self.tab_control_2d = self.create_notebook(self.window_2d, '2d')
         
         self.heatmap_frame = ttk.Frame(self.tab_control_2d)
-        self.draw_heatmap(self.heatmap_frame, self.data_2d)
         self.tab_control_2d.add(self.heatmap_frame, text="Тепловая карта")
         
         self.contour_frame = ttk.Frame(self.tab_control_2d)
-        self.draw_contour(self.contour_frame, self.data_2d)
         self.tab_control_2d.add(self.contour_frame, text="Контуры")
         
+        self.overview_frame = ttk.Frame(self.tab_control_2d)
+        self.tab_control_2d.add(self.overview_frame, text="Обзор")
+        
         self.tab_control_2d.pack(expand=1, fill="both", padx=10, pady=10)
+        self.invalidate_tabs('2d', {
+            self.heatmap_frame: lambda: self.draw_heatmap(self.heatmap_frame, self.data_2d),
+            self.contour_frame: lambda: self.draw_contour(self.contour_frame, self.data_2d),
+            self.overview_frame: lambda: self.draw_overview(self.overview_frame, self.dataset_2d),
+        })
+
+    def draw_overview(self, parent, name):
+        """Обзор всего набора Ker с масштабированием и сдвигом (вкладка строится один раз при открытии формы)"""
+        main_frame = ttk.Frame(parent)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        if name is None and (self.data_2d.ndim != 2 or self.data_2d.size == 0):
+            ttk.Label(main_frame, text="Нет данных Ker: сгенерируйте данные").pack(pady=20)
+            return
+        if name is None:
+            self.show_overview(main_frame, TilePyramid.from_array(self.data_2d), (0, 0))
+            return
+        result = self.db.ker_pyramid(name, build=False)
+        if result is not None:
+            self.show_overview(main_frame, *result)
+            return
+        # набор из старого каталога без пирамиды: уровни строятся один раз в фоне, окно не замирает
+        waiting = ttk.Label(main_frame, text="Строится пирамида детализации...")
+        waiting.pack(pady=20)
+        built = queue.Queue()
+        def build():
+            try:
+                built.put(self.db.ker_pyramid(name))
+            except Exception as e:
+                built.put(e)
+            finally:
+                self.db.pool.release()
+        def poll():
+            if not main_frame.winfo_exists():
+                return
+            try:
+                result = built.get_nowait()
+            except queue.Empty:
+                self.after(100, poll)
+                return
+            if isinstance(result, Exception):
+                waiting.config(text=f"Не удалось построить обзор: {result}")
+                return
+            waiting.destroy()
+            self.show_overview(main_frame, *result)
+        threading.Thread(target=build, daemon=True).start()
+        self.after(100, poll)
+
+    def show_overview(self, main_frame, pyramid, origin):
+        """Холст обзора с масштабированием поверх готовой пирамиды"""
+        x0, y0 = origin
+        canvas = tk.Canvas(main_frame, width=600, height=600, bg='white')
+        canvas.pack(pady=10)
+        status = ttk.Label(main_frame)
+        status.pack()
+        
+        def show_status(zoom):
+            level = max(0, -zoom.zoom)
+            scale = f"1:{1 << level}" if level else f"{1 << zoom.zoom}:1"
+            status.config(text=f"Центр: ({x0 + int(zoom.center[0])}, {y0 + int(zoom.center[1])})   "
+                               f"Масштаб: {scale}   Уровень: {level} из {pyramid.levels - 1}")
+        
+        self.overview_view = ZoomView(canvas, pyramid, self.HEATMAP_PALETTE, 600, 600, on_change=show_status)
+        self.overview_view.render()
+        
+        desc_frame = ttk.Frame(main_frame)
+        desc_frame.pack(fill=tk.X, padx=10, pady=5)
+        text = """Обзор всего набора значений Ker:
+            • Колесо мыши - масштаб, перетаскивание - сдвиг
+            • При уменьшении каждая ячейка - самое частое значение Ker в блоке
+            • Цвета соответствуют тепловой карте
+        """
+        ttk.Label(desc_frame, text=text, wraplength=580, justify=tk.LEFT).pack()
 
     def draw_heatmap(self, parent, data):
-        """Улучшенная тепловая карта"""
+        """Тепловая карта; при повторных вызовах перерисовываются только изменившиеся пиксели"""
+        if self.heatmap_view is None:
+            self.heatmap_view = self.build_heatmap(parent)
+        data = np.asarray(data)
+        if data.ndim != 2 or data.size == 0:
+            return
+        cell_size = RasterRenderer.fit_scale(data.shape, 600)
+        self.heatmap_view.show(RasterRenderer.pixels(data, self.HEATMAP_PALETTE, cell_size))
+
+    def build_heatmap(self, parent):
+        """Холст, легенда и описание тепловой карты"""
         for widget in parent.winfo_children():
             widget.destroy()
         
@@ -384,23 +2228,8 @@ class MainApp(tk.Tk):
         
         canvas = tk.Canvas(main_frame, width=600, height=600, bg='white')
         canvas.pack(pady=10)
-        
-        color_map = {
-            0: '#2ecc71', 1: '#3498db', 2: '#e74c3c',
-            3: '#f1c40f', 4: '#9b59b6', 5: '#34495e',
-            6: '#FF00FF', 7: '#00FFFF', 8: '#FFA500', 9: '#808080'
-        }
-        
-        cell_size = 6
-        for x in range(100):
-            for y in range(100):
-                value = data[x][y]  
-                color = color_map.get(value, '#ffffff')
-                canvas.create_rectangle(
-                    x*cell_size, y*cell_size,
-                    (x+1)*cell_size, (y+1)*cell_size,
-                    fill=color, outline=""
-                )
+        view = RasterView(canvas)
+        color_map = self.HEATMAP_COLORS
         
         legend_frame = ttk.Frame(main_frame)
         legend_frame.pack(pady=5)
@@ -434,9 +2263,20 @@ class MainApp(tk.Tk):
             • Изменяйте параметры для анализа паттернов
         """
         ttk.Label(desc_frame, text=text, wraplength=580, justify=tk.LEFT).pack()
+        return view
 
     def draw_contour(self, parent, data):
-        """Улучшенная контурная карта"""
+        """Контурная карта; при повторных вызовах перерисовываются только изменившиеся пиксели"""
+        if self.contour_view is None:
+            self.contour_view = self.build_contour(parent)
+        data = np.asarray(data)
+        if data.ndim != 2 or data.size == 0:
+            return
+        cell_size = RasterRenderer.fit_scale(data.shape, 600)
+        self.contour_view.show(RasterRenderer.pixels(data, self.CONTOUR_PALETTE, cell_size))
+
+    def build_contour(self, parent):
+        """Холст, легенда и описание контурной карты"""
         for widget in parent.winfo_children():
             widget.destroy()
         
@@ -445,17 +2285,7 @@ class MainApp(tk.Tk):
         
         canvas = tk.Canvas(main_frame, width=600, height=600, bg='white')
         canvas.pack(pady=10)
-        
-        levels = [0, 2, 4, 6, 8]
-        cell_size = 6
-        for x in range(100):
-            for y in range(100):
-                if data[x][y] in levels:
-                    canvas.create_rectangle(
-                        x*cell_size, y*cell_size,
-                        (x+1)*cell_size, (y+1)*cell_size,
-                        fill='#2c3e50', outline=""
-                    )
+        view = RasterView(canvas)
         
         legend_frame = ttk.Frame(main_frame)
         legend_frame.pack(pady=5)
@@ -476,8 +2306,14 @@ class MainApp(tk.Tk):
             • Используйте совместно с тепловой картой для анализа
         """
         ttk.Label(desc_frame, text=text, wraplength=580, justify=tk.LEFT).pack()
+        return view
 
-    def update_1d_viz(self):
+    def live_update_1d(self):
+        """Пересчет после правки параметров: без сообщений об ошибках, пока ввод не завершен"""
+        if self.window_1d and self.window_1d.winfo_exists():
+            self.update_1d_viz(quiet=True)
+
+    def update_1d_viz(self, quiet=False):
         """Обновление 1D визуализаций с проверкой"""
         try:
             model = self.model_1d_var.get()
@@ -486,18 +2322,33 @@ class MainApp(tk.Tk):
             if model == 'HMM_N':
                 if not 2 <= param <= 100:
                     raise ValueError("Модуль должен быть от 2 до 100")
-                processed_data = HMM.hmm_n(self.data_1d, param)
+                processed_data = self.transform_cache.get_or_compute(
+                    (self.hash_1d, model, param), lambda: HMMEngine.n(self.data_1d, param, out=self.buffer_1d))
             else:
-                if param < 1:
-                    raise ValueError("База должна быть больше 0")
-                processed_data = HMM.hmm_b(self.data_1d, param)
+                if not 1 <= param < DistributionStats.MAX_BASE:
+                    raise ValueError(f"База должна быть от 1 до {DistributionStats.MAX_BASE - 1}")
+                processed_data = self.transform_cache.get_or_compute(
+                    (self.hash_1d, model, param), lambda: HMMEngine.b(self.data_1d, param, out=self.buffer_1d))
             
-            self.draw_ulam_spiral(self.spiral_frame, processed_data)
-            self.draw_pie_chart(self.pie_frame, processed_data)
+            if model == 'HMM_N':
+                counts, labels = self.stats_1d.residues(param), None
+            else:
+                first, width, counts = self.stats_1d.buckets(param)
+                labels = [f"[{(first + i) * width}, {(first + i + 1) * width})" for i in range(len(counts))]
+            self.invalidate_tabs('1d', {
+                self.spiral_frame: lambda: self.draw_ulam_spiral(self.spiral_frame, processed_data),
+                self.pie_frame: lambda: self.draw_pie_chart(self.pie_frame, counts, labels),
+            })
         except ValueError as e:
-            messagebox.showerror("Ошибка", f"Некорректный параметр: {str(e)}")
+            if not quiet:
+                messagebox.showerror("Ошибка", f"Некорректный параметр: {str(e)}")
+
+    def live_update_2d(self):
+        """Пересчет после правки параметров: без сообщений об ошибках, пока ввод не завершен"""
+        if self.window_2d and self.window_2d.winfo_exists():
+            self.update_2d_viz(quiet=True)
 
-    def update_2d_viz(self):
+    def update_2d_viz(self, quiet=False):
         """Обновление 2D визуализаций с проверкой"""
         try:
             model = self.model_2d_var.get()
@@ -507,16 +2358,21 @@ class MainApp(tk.Tk):
             if model == 'HMM_DN':
                 if not 2 <= a <= 100:
                     raise ValueError("Модуль должен быть от 2 до 100")
-                processed_data = HMM.hmm_dn(self.data_2d, a)
+                processed_data = self.transform_cache.get_or_compute(
+                    (self.hash_2d, model, a), lambda: HMMEngine.dn(self.data_2d, a, out=self.buffer_2d))
             else:
                 if not (-100 <= a <= 100) or not (-100 <= b <= 100):
                     raise ValueError("Коэффициенты должны быть от -100 до 100")
-                processed_data = HMM.hmm_r(self.data_2d, a, b)
+                processed_data = self.transform_cache.get_or_compute(
+                    (self.hash_2d, model, a, b), lambda: HMMEngine.r(self.data_2d, a, b, out=self.buffer_2d))
             
-            self.draw_heatmap(self.heatmap_frame, processed_data)
-            self.draw_contour(self.contour_frame, processed_data)
+            self.invalidate_tabs('2d', {
+                self.heatmap_frame: lambda: self.draw_heatmap(self.heatmap_frame, processed_data),
+                self.contour_frame: lambda: self.draw_contour(self.contour_frame, processed_data),
+            })
         except ValueError as e:
-            messagebox.showerror("Ошибка", f"Некорректные параметры: {str(e)}")
+            if not quiet:
+                messagebox.showerror("Ошибка", f"Некорректные параметры: {str(e)}")
 
     def show_about(self):
         """Информация о программе"""